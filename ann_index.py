@@ -0,0 +1,104 @@
+import json
+import os
+import numpy as np
+
+
+class IVFIndex:
+    """Inverted-file (IVF) index over an L2-normalized embedding matrix, in pure NumPy.
+
+    Rows are clustered with spherical k-means; a query only scans the `nprobe` lists whose
+    centroids are closest to it. Raising `nprobe` trades speed for recall (nprobe == n_lists is exact).
+    The index stores row ids only; vectors are read from the catalog matrix passed to `search`.
+    """
+
+    def __init__(self, centroids: np.ndarray, list_offsets: np.ndarray, list_ids: np.ndarray, nprobe: int = 8):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+        self.nprobe = nprobe
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, n_lists: int = None, n_iter: int = 10, nprobe: int = 8, seed: int = 0):
+        """Trains centroids on a sample of rows, then assigns every row to its nearest list."""
+        n_rows = len(matrix)
+        if n_lists is None:
+            n_lists = max(1, int(4 * np.sqrt(n_rows)))
+        n_lists = min(n_lists, n_rows)
+        rng = np.random.default_rng(seed)
+
+        # Train on at most 64 points per list; assignment below still covers every row
+        train_size = min(n_rows, 64 * n_lists)
+        train = matrix[np.sort(rng.choice(n_rows, train_size, replace=False))]
+        centroids = train[rng.choice(train_size, n_lists, replace=False)].astype(np.float32, copy=True)
+        for _ in range(n_iter):
+            assignment = np.argmax(train @ centroids.T, axis=1)
+            order = np.argsort(assignment, kind='stable')
+            counts = np.bincount(assignment, minlength=n_lists)
+            empty = counts == 0
+            sums = np.zeros_like(centroids)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            sums[~empty] = np.add.reduceat(train[order], starts[~empty], axis=0)
+            # Re-seed empty lists from random training rows so no list stays dead
+            sums[empty] = train[rng.choice(train_size, int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        assignment = np.concatenate([
+            np.argmax(matrix[start:start + 65536] @ centroids.T, axis=1)
+            for start in range(0, n_rows, 65536)
+        ])
+        list_ids = np.argsort(assignment, kind='stable').astype(np.int32)
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))]).astype(np.int64)
+        return cls(centroids, list_offsets, list_ids, nprobe)
+
+    def candidates(self, query: np.ndarray, nprobe: int = None):
+        """Returns the row ids stored in the `nprobe` lists closest to a normalized query."""
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        return np.concatenate([self.list_ids[self.list_offsets[l]:self.list_offsets[l + 1]] for l in probe])
+
+    def search(self, query: np.ndarray, matrix: np.ndarray, k: int, nprobe: int = None):
+        """Approximate top-k by cosine similarity. Returns (row ids, similarities), best first."""
+        ids = self.candidates(query, nprobe)
+        similarities = matrix[ids] @ query
+        if len(ids) > k:
+            keep = np.argpartition(-similarities, k - 1)[:k]
+            ids, similarities = ids[keep], similarities[keep]
+        order = np.argsort(-similarities)
+        return ids[order], similarities[order]
+
+    def save(self, path: str, fingerprint: dict):
+        """Writes the index atomically so a crashed build never leaves a half-written file behind.
+
+        `fingerprint` identifies the matrix it was built from (see catalog.build_fingerprint).
+        """
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, centroids=self.centroids, list_offsets=self.list_offsets,
+                 list_ids=self.list_ids, nprobe=self.nprobe, fingerprint=json.dumps(fingerprint, sort_keys=True))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, fingerprint: dict = None):
+        """Loads a saved index; returns None if it is missing or was built for a different fingerprint."""
+        if not os.path.exists(path): return None
+        with np.load(path) as data:
+            if fingerprint is not None and str(data['fingerprint']) != json.dumps(fingerprint, sort_keys=True):
+                return None
+            return cls(data['centroids'], data['list_offsets'], data['list_ids'], int(data['nprobe']))
+
+
+def load_or_build_index(path: str, matrix: np.ndarray, fingerprint: dict, nprobe: int = 8):
+    """Reloads the IVF index saved for a catalog build, rebuilding it if it is missing or stale."""
+    index = IVFIndex.load(path, fingerprint)
+    if index is None:
+        print(f"Building ANN index at '{path}'...")
+        index = IVFIndex.build(matrix, nprobe=nprobe)
+        index.save(path, fingerprint)
+    index.nprobe = nprobe
+    return index
@@ -1,284 +1,541 @@
 import pandas as pd
 import numpy as np
 import os
+import json
+import base64
+import unicodedata
+import time
+import threading
 from dotenv import load_dotenv
 import google.generativeai as genai
-from sklearn.metrics.pairwise import cosine_similarity
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import re
-from typing import List, Optional
+from typing import List, Optional, Union
 import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from scoring import batch_top_k, build_embedding_matrix, hybrid_scores, normalize_query, top_k_indices
+from ann_index import load_or_build_index
+from title_index import TRACK_SEPARATOR, TitleIndex, TrackIndex, process_title_for_search, track_search_keys
+from lexical_index import BM25Index
+from catalog import build_fingerprint, load_catalog
+from neighbors import load_neighbors
+from autocomplete import Autocomplete
+from cache import CacheRegistry, PersistentStore, SingleFlight
+from deferred_jobs import DeferredJobs
+import explanations
+from explanations import explanation_key, explanation_label
+from metrics import LatencyStats
+from metadata_client import TMDbClient, GoogleBooksClient, UpstreamError
+from responses import (BatchRecommendationsResponse, BookRecommendationsResponse, ExplanationStatus, FastJSONResponse,
+                       MixedRecommendationsResponse, MovieRecommendationsResponse, MusicRecommendationsResponse,
+                       project_records, recommendation_response)
 
 # --- CONFIGURATION ---
 load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
 GOOGLE_BOOKS_API_KEY = os.getenv("GOOGLE_BOOKS_API_KEY")
+# Overridable so tests/benchmarks can point at a local stub server
+TMDB_API_BASE = os.getenv("TMDB_API_BASE", "https://api.themoviedb.org")
+GOOGLE_BOOKS_API_BASE = os.getenv("GOOGLE_BOOKS_API_BASE", "https://www.googleapis.com")
+IMAGE_FETCH_WORKERS = int(os.getenv("IMAGE_FETCH_WORKERS", "32"))  # Cap on concurrent image lookups, shared by all requests
+IMAGE_FETCH_DEADLINE = float(os.getenv("IMAGE_FETCH_DEADLINE", "3.0"))  # Seconds a response waits for its images
+TMDB_RATE_LIMIT = float(os.getenv("TMDB_RATE_LIMIT", "40"))  # Requests/second, kept under TMDb's quota
+GOOGLE_BOOKS_RATE_LIMIT = float(os.getenv("GOOGLE_BOOKS_RATE_LIMIT", "10"))
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "2.0"))
+UPSTREAM_READ_TIMEOUT = float(os.getenv("UPSTREAM_READ_TIMEOUT", "4.0"))
+# Prebuilt catalog artifacts (python catalog.py); a missing/stale one is rebuilt at boot unless auto-build is off
+CATALOG_DIR = os.getenv("CATALOG_DIR", "data/catalog")
+CATALOG_AUTO_BUILD = os.getenv("CATALOG_AUTO_BUILD", "1") == "1"
+# Worker processes for `python api.py`; they all map the same embedding files, so vectors are shared, not copied
+# (metadata frames and lookup indexes are built per process)
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+# "exact" scans the whole catalog; "ann" scores only the probed lists of an IVF index
+SEARCH_MODE = os.getenv("SEARCH_MODE", "exact")
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "8"))  # More lists probed = higher recall, slower queries
+# Music is several times larger than the other catalogs, so it is served from the IVF index by default
+MUSIC_SEARCH_MODE = os.getenv("MUSIC_SEARCH_MODE", "ann")
+# /recommend/batch: seeds per request, and the memory bound for one tile of the seeds x catalog score matrix
+BATCH_MAX_SEEDS = int(os.getenv("BATCH_MAX_SEEDS", "1000"))
+BATCH_TILE_MB = int(os.getenv("BATCH_TILE_MB", "64"))
+BATCH_MAX_IMAGE_FETCHES = int(os.getenv("BATCH_MAX_IMAGE_FETCHES", "200"))  # Uncached image lookups one batch may start
+# Answer single-seed requests from the offline neighbour tables (python neighbors.py) while they match the catalog
+USE_NEIGHBOR_TABLES = os.getenv("USE_NEIGHBOR_TABLES", "1") == "1"
+# Cache limits: entry counts per namespace, lifetimes in seconds
+IMAGE_CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", "50000"))
+IMAGE_CACHE_TTL = float(os.getenv("IMAGE_CACHE_TTL", str(7 * 24 * 3600)))
+NEGATIVE_CACHE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", "600"))  # "No Poster Found" is retried after this
+EXPLANATION_CACHE_SIZE = int(os.getenv("EXPLANATION_CACHE_SIZE", "20000"))
+EXPLANATION_CACHE_TTL = float(os.getenv("EXPLANATION_CACHE_TTL", str(30 * 24 * 3600)))
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "data/cache.sqlite3")  # Empty string disables the on-disk cache
+# "inline" waits for the LLM explanation; "deferred" waits at most EXPLANATION_INLINE_WAIT seconds, then returns
+# an explanation_id to fetch from /explanations/{id} (or its SSE stream). Cached explanations are always inline.
+EXPLANATION_MODE = os.getenv("EXPLANATION_MODE", "inline")
+EXPLANATION_INLINE_WAIT = float(os.getenv("EXPLANATION_INLINE_WAIT", "0.2"))
+EXPLANATION_WORKERS = int(os.getenv("EXPLANATION_WORKERS", "4"))
+EXPLANATION_TICKET_TTL = float(os.getenv("EXPLANATION_TICKET_TTL", "600"))  # Seconds a ticket can be fetched for
+VIBE_EMBEDDING_MODEL = os.getenv("VIBE_EMBEDDING_MODEL", "models/embedding-001")
+VIBE_CACHE_SIZE = int(os.getenv("VIBE_CACHE_SIZE", "10000"))  # Query embeddings, about 4KB each
+VIBE_CACHE_TTL = float(os.getenv("VIBE_CACHE_TTL", str(30 * 24 * 3600)))
+VIBE_CACHE_PERSIST = os.getenv("VIBE_CACHE_PERSIST", "1") == "1"
+# Seconds /vibe waits for the embedding search before answering from the local keyword search instead
+VIBE_DEADLINE = float(os.getenv("VIBE_DEADLINE", "1.0"))
+VIBE_WORKERS = int(os.getenv("VIBE_WORKERS", "8"))  # Cap on concurrent embed searches; beyond it /vibe answers by keyword
+VIBE_EMBED_TIMEOUT = float(os.getenv("VIBE_EMBED_TIMEOUT", "10"))  # Seconds before a hung embed call gives up its worker
+
+PLACEHOLDER_POSTER = "https://via.placeholder.com/500x750.png?text=No+Poster+Found"
+PLACEHOLDER_COVER = "https://via.placeholder.com/500x750.png?text=No+Cover+Found"
+
+# Long-lived pooled sessions, one per upstream (see metadata_client.py)
+_upstream_options = dict(pool_size=IMAGE_FETCH_WORKERS, connect_timeout=UPSTREAM_CONNECT_TIMEOUT, read_timeout=UPSTREAM_READ_TIMEOUT)
+tmdb_client = TMDbClient(TMDB_API_KEY, TMDB_API_BASE, TMDB_RATE_LIMIT, **_upstream_options)
+google_books_client = GoogleBooksClient(GOOGLE_BOOKS_API_KEY, GOOGLE_BOOKS_API_BASE, GOOGLE_BOOKS_RATE_LIMIT, **_upstream_options)
 
 # --- CACHING ---
-_cache = {}
+_cache = {}  # Loaded catalogs and their derived arrays/indexes (bounded by catalog size)
+# Posters, covers and explanations also persist to disk so restarts don't re-hit the external APIs
+caches = CacheRegistry(PersistentStore(CACHE_DB_PATH) if CACHE_DB_PATH else None)
+poster_cache = caches.namespace("posters", IMAGE_CACHE_SIZE, IMAGE_CACHE_TTL, NEGATIVE_CACHE_TTL, persistent=True)
+cover_cache = caches.namespace("covers", IMAGE_CACHE_SIZE, IMAGE_CACHE_TTL, NEGATIVE_CACHE_TTL, persistent=True)
+explanation_cache = caches.namespace("explanations", EXPLANATION_CACHE_SIZE, EXPLANATION_CACHE_TTL, persistent=True)
+# Ticket -> explanation key, committed before the response so every API worker can resolve any ticket
+explanation_tickets = caches.namespace("explanation_tickets", EXPLANATION_CACHE_SIZE, EXPLANATION_TICKET_TTL, persistent=True,
+                                       write_through=True)
+explanation_jobs = DeferredJobs("explain", explanation_cache, explanation_tickets, EXPLANATION_WORKERS)
+vibe_embedding_cache = caches.namespace("vibe_embeddings", VIBE_CACHE_SIZE, VIBE_CACHE_TTL, persistent=VIBE_CACHE_PERSIST)
+vibe_embed_flight = SingleFlight()  # One upstream embed call per distinct vibe in flight
+vibe_metrics = LatencyStats()
 
 # --- HELPER FUNCTIONS: DATA PROCESSING ---
 
-def process_title_for_search(title: str):
-    """Applies all normalization rules to a title string for searching."""
-    if not isinstance(title, str): return ""
-    
-    # Step 1: Remove ANY text in parentheses at the end of the string.
-    # This now handles both (1995) and (Series, #Number) formats like in Harry Potter.
-    processed_title = re.sub(r'\s*\([^)]*\)\s*$', '', title).strip()
-    
-    # Step 2: Now, handle articles like ", The".
-    if processed_title.endswith(', The'): processed_title = 'The ' + processed_title[:-5]
-    if processed_title.endswith(', A'): processed_title = 'A ' + processed_title[:-3]
-    if processed_title.endswith(', An'): processed_title = 'An ' + processed_title[:-4]
-    
-    # Step 3: Remove leading articles.
-    processed_title = re.sub(r'^(the|a|an)\s+', '', processed_title, flags=re.IGNORECASE)
-    
-    # Step 4: Final cleanup.
-    return re.sub(r'[^a-zA-Z0-9]', '', processed_title).lower()
+def _load_catalog(name: str):
+    """Loads a prebuilt catalog artifact (see catalog.py) and builds the in-memory lookup structures.
+
+    The frame holds metadata only and is private to this worker process; vectors stay in the
+    shared, read-only mapped matrix.
+    """
+    df, store, pop_norm = load_catalog(name, CATALOG_DIR, auto_build=CATALOG_AUTO_BUILD)
+    matrix = store.matrix
+    _cache[name] = df
+    _cache[f"{name}_embeddings"] = store
+    _cache[f"{name}_matrix"] = matrix
+    _cache[f"{name}_pop_norm"] = pop_norm
+    _cache[f"{name}_titles"] = TitleIndex(df['search_title'])
+    _cache[f"{name}_lexical"] = build_lexical_index(df, LEXICAL_COLUMNS[name])
+    if USE_NEIGHBOR_TABLES:
+        _cache[f"{name}_neighbors"] = load_neighbors(name, CATALOG_DIR)
+    search_mode = MUSIC_SEARCH_MODE if name == "music" else SEARCH_MODE
+    if name == "music":
+        # Tracks are found by name or by the "track - artist" strings /search/music returns
+        _cache["music_tracks"] = TrackIndex(_cache["music_titles"], df['search_artist'])
+        _cache["music_autocomplete"] = Autocomplete(track_search_keys(df['search_title'], df['search_artist']), pop_norm)
+    else:
+        _cache[f"{name}_autocomplete"] = Autocomplete(df['search_title'], pop_norm)
+    if search_mode == "ann":
+        # Stored with the catalog it indexes and keyed on its build, so a rebuild or another CATALOG_DIR never reuses it
+        _cache[f"{name}_ann"] = load_or_build_index(os.path.join(CATALOG_DIR, name, "ann.ivf.npz"), matrix,
+                                                    build_fingerprint(name, CATALOG_DIR), ANN_NPROBE)
+    return df
+
+# Text searched by the local lexical engine (the /vibe keyword path), per catalog
+LEXICAL_COLUMNS = {"movies": ["title", "genres"], "books": ["title", "authors"], "music": ["title", "artists", "track_genre"]}
+
+def build_lexical_index(df: pd.DataFrame, columns: List[str]):
+    # MovieLens' placeholder for "no genres" would otherwise match queries for "no" or "listed"
+    return BM25Index([df[column].replace('(no genres listed)', '') if column == 'genres' else df[column] for column in columns])
 
 def load_movie_data():
-    """Loads all movie data files, including custom additions, and merges them."""
+    """Loads the prebuilt movie catalog (movies, links, ratings and custom additions, already merged)."""
     if "movies" in _cache: return _cache["movies"]
-    embeddings_df = pd.read_parquet("data/movie_embeddings.parquet")
-    movies_genres_df = pd.read_csv("data/movies.csv")[['movieId', 'genres']]
-    links_df = pd.read_csv("data/links.csv")[['movieId', 'tmdbId']]
-    ratings_df = pd.read_csv("data/ratings.csv")
-    
-    # Compute average rating and popularity (number of ratings)
-    avg_ratings = ratings_df.groupby('movieId')['rating'].mean().to_dict()
-    ratings_count = ratings_df.groupby('movieId').size().to_dict()
-    
-    merged_df = pd.merge(embeddings_df, movies_genres_df, on='movieId', how='inner')
-    final_df = pd.merge(merged_df, links_df, on='movieId', how='inner')
-    
-    # Add avg_rating and popularity
-    final_df['avg_rating'] = final_df['movieId'].map(avg_ratings).fillna(3.5)  # Default to neutral
-    final_df['popularity'] = final_df['movieId'].map(ratings_count).fillna(1)  # At least 1 to avoid div0
-    
-    try:
-        custom_embeddings_df = pd.read_parquet("data/custom_embeddings.parquet")
-        # For custom, assume default popularity and rating if not present
-        custom_embeddings_df['avg_rating'] = custom_embeddings_df.get('avg_rating', 3.5)
-        custom_embeddings_df['popularity'] = custom_embeddings_df.get('popularity', 100)
-        final_df = pd.concat([final_df, custom_embeddings_df], ignore_index=True)
-        print(f"Successfully loaded and combined {len(custom_embeddings_df)} custom movies.")
-    except FileNotFoundError:
-        print("No custom movies file found.")
-    
-    final_df.dropna(subset=['tmdbId'], inplace=True)
-    final_df['tmdbId'] = final_df['tmdbId'].astype(int)
-    final_df['search_title'] = final_df['title'].apply(process_title_for_search)
-    
-    # Normalize popularity for hybrid (log scale for better distribution)
-    final_df['pop_norm'] = np.log1p(final_df['popularity']) / np.log1p(final_df['popularity'].max())
-    
-    _cache["movies"] = final_df
+    final_df = _load_catalog("movies")
     print("Movie data loaded and cached.")
     return final_df
 
 def load_book_data():
-    """Loads and prepares the book data."""
+    """Loads the prebuilt book catalog."""
     if "books" in _cache: return _cache["books"]
-    df = pd.read_parquet("data/book_embeddings.parquet")
-    df.dropna(subset=['isbn', 'title', 'authors'], inplace=True)
-    df['search_title'] = df['title'].apply(process_title_for_search)
-    
-    # Assume book data has 'average_rating' and 'ratings_count'; if not, fill defaults
-    if 'average_rating' not in df.columns:
-        df['average_rating'] = 4.0  # Default
-    if 'ratings_count' not in df.columns:
-        df['ratings_count'] = 1000  # Default popularity
-    
-    # Use ratings_count as popularity
-    df['popularity'] = df['ratings_count']
-    df['avg_rating'] = df['average_rating']  # Expose as avg_rating for consistency
-    # Normalize popularity (log scale)
-    df['pop_norm'] = np.log1p(df['popularity']) / np.log1p(df['popularity'].max())
-    
-    _cache["books"] = df
+    df = _load_catalog("books")
     print("Book data loaded and cached.")
     return df
 
+def load_music_data():
+    """Loads the prebuilt music catalog, or returns None if no music embeddings have been generated."""
+    if "music" in _cache: return _cache["music"]
+    if not os.path.exists("data/music_embeddings.parquet") and not os.path.exists(os.path.join(CATALOG_DIR, "music", "manifest.json")):
+        print("No music embeddings found; music endpoints are disabled.")
+        return None
+    df = _load_catalog("music")
+    print("Music data loaded and cached.")
+    return df
+
+def _catalog_name(df: pd.DataFrame):
+    """Returns the _cache name ("movies"/"books"/"music") a frame was loaded under, or None."""
+    for name in ("movies", "books", "music"):
+        if _cache.get(name) is df:
+            return name
+    return None
+
+def get_catalog_arrays(df: pd.DataFrame):
+    """Returns the preloaded (normalized float32 embedding matrix, pop_norm array) for a catalog."""
+    name = _catalog_name(df)
+    if name is not None:
+        return _cache[f"{name}_matrix"], _cache[f"{name}_pop_norm"]
+    # Frames that didn't come from the loaders (and still carry an `embedding` column) are converted on the fly
+    return build_embedding_matrix(df['embedding'].values), df['pop_norm'].to_numpy(dtype=np.float32)
+
+def catalog_embedding_rows(results_df: pd.DataFrame, kind: str):
+    """Embedding vectors for a results frame, read by row label from the mapped catalog matrices.
+
+    Result rows keep their catalog row number as index label; mixed results pick the movie
+    or book matrix per row from their `category`.
+    """
+    kinds = results_df['category'].tolist() if kind == 'mixed' else [kind] * len(results_df)
+    stores = {'movie': _cache["movies_embeddings"], 'book': _cache["books_embeddings"], 'music': _cache.get("music_embeddings")}
+    return [stores[row_kind].rows([label])[0] for row_kind, label in zip(kinds, results_df.index)]
+
+def get_title_index(df: pd.DataFrame):
+    """Returns the title lookup index built for a catalog at load time."""
+    name = _catalog_name(df)
+    if name is not None:
+        return _cache[f"{name}_titles"]
+    return TitleIndex(df['search_title'])
+
+def get_lexical_index(df: pd.DataFrame):
+    """Returns the BM25 index built for a catalog at load time."""
+    name = _catalog_name(df)
+    if name is not None:
+        return _cache[f"{name}_lexical"]
+    return build_lexical_index(df, [column for column in ("title", "genres", "authors") if column in df.columns])
+
+def find_title(title: str, df: pd.DataFrame, partial: bool = False):
+    """Resolves a user-supplied title to a catalog row index, or None if nothing matches.
+
+    Movies match the normalized title exactly; books (partial=True) take the first title containing it.
+    """
+    search_term = process_title_for_search(title)
+    titles = get_title_index(df)
+    return titles.find_first_containing(search_term) if partial else titles.find(search_term)
+
+def find_track(query: str):
+    """Resolves a track name, or a "track - artist" string as returned by /search/music, to a music row index.
+
+    Rows are in popularity order, so name clashes resolve to the best-known track (see TrackIndex).
+    """
+    return _cache["music_tracks"].find(query)
+
+def find_item(title: str, df: pd.DataFrame, item_type: str):
+    """Resolves a favorite of any domain: movies match exactly, books partially, music by track (and artist)."""
+    if item_type == 'music': return find_track(title)
+    return find_title(title, df, partial=(item_type == 'book'))
+
+def rank_catalog(query_embedding, df: pd.DataFrame, n: int, exclude=None):
+    """Returns (row indices, hybrid scores) of the n best-scoring catalog rows, best first.
+
+    Rows listed in `exclude` (e.g. the seed item or the user's own favorites) are never returned.
+    In "ann" search mode only the rows in the IVF lists nearest the query are scored.
+    """
+    exclude = set(exclude or ())
+    all_embeddings, pop_norm = get_catalog_arrays(df)
+    query = normalize_query(query_embedding)
+    name = _catalog_name(df)
+    ann_index = _cache.get(f"{name}_ann") if name else None
+    
+    candidate_ids = ann_index.candidates(query) if ann_index is not None else None
+    if candidate_ids is not None and len(candidate_ids) >= n + len(exclude):
+        scores = hybrid_scores(query, all_embeddings[candidate_ids], pop_norm[candidate_ids])
+        excluded_positions = np.flatnonzero(np.isin(candidate_ids, list(exclude)))
+    else:
+        candidate_ids = None
+        scores = hybrid_scores(query, all_embeddings, pop_norm)
+        excluded_positions = exclude
+    
+    order = top_k_indices(scores, n, exclude=excluded_positions)
+    indices = order if candidate_ids is None else candidate_ids[order]
+    return indices, scores[order]
+
 # --- HELPER FUNCTIONS: EXTERNAL APIS ---
 
 def fetch_poster(tmdb_id: int):
-    """Fetches a movie poster URL from TMDb, with caching and retries."""
-    if tmdb_id in _cache: return _cache[tmdb_id]
-    
-    retry_strategy = Retry(total=3, status_forcelist=[429, 500, 502, 503, 504], backoff_factor=1)
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-    session = requests.Session()
-    session.mount("https://", adapter); session.mount("http://", adapter)
-    url = f"https://api.themoviedb.org/3/movie/{tmdb_id}?api_key={TMDB_API_KEY}&language=en-US"
+    """Fetches a movie poster URL from TMDb, with caching."""
+    tmdb_id = int(tmdb_id)  # numpy ints from DataFrame rows would make distinct cache keys
+    cached = poster_cache.get(tmdb_id)
+    if cached is not None: return cached
     
     try:
-        response = session.get(url)
-        response.raise_for_status()
-        data = response.json()
-        poster_path = data.get('poster_path')
-        if poster_path:
-            full_url = f"https://image.tmdb.org/t/p/w500/{poster_path}"
-            _cache[tmdb_id] = full_url
-            return full_url
-    except requests.exceptions.RequestException as e:
+        poster_url = tmdb_client.poster_url(tmdb_id)
+    except UpstreamError as e:
+        # Not cached: the client's circuit breaker already keeps a failing upstream from being hammered
         print(f"API request failed for tmdbId {tmdb_id}: {e}")
-        
-    return "https://via.placeholder.com/500x750.png?text=No+Poster+Found"
+        return PLACEHOLDER_POSTER
+    
+    if poster_url is None:
+        poster_cache.put_negative(tmdb_id, PLACEHOLDER_POSTER)
+        return PLACEHOLDER_POSTER
+    poster_cache.put(tmdb_id, poster_url)
+    return poster_url
 
 def fetch_book_cover(isbn: str):
-    """Fetches a book cover URL from the Google Books API."""
-    if isbn in _cache: return _cache[isbn]
+    """Fetches a book cover URL from the Google Books API, with caching."""
+    isbn = str(isbn)
+    cached = cover_cache.get(isbn)
+    if cached is not None: return cached
     
-    url = f"https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn}&key={GOOGLE_BOOKS_API_KEY}"
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        if "items" in data and len(data["items"]) > 0:
-            thumbnail = data["items"][0]["volumeInfo"].get("imageLinks", {}).get("thumbnail")
-            if thumbnail:
-                _cache[isbn] = thumbnail
-                return thumbnail
-    except Exception as e:
+        cover_url = google_books_client.cover_url(isbn)
+    except UpstreamError as e:
         print(f"Failed to get book cover for ISBN {isbn}: {e}")
-        
-    return "https://via.placeholder.com/500x750.png?text=No+Cover+Found"
+        return PLACEHOLDER_COVER
+    
+    if cover_url is None:
+        cover_cache.put_negative(isbn, PLACEHOLDER_COVER)
+        return PLACEHOLDER_COVER
+    cover_cache.put(isbn, cover_url)
+    return cover_url
+
+_image_pool = ThreadPoolExecutor(max_workers=IMAGE_FETCH_WORKERS, thread_name_prefix="image-fetch")
+_image_placeholders = {fetch_poster: PLACEHOLDER_POSTER, fetch_book_cover: PLACEHOLDER_COVER}
+_image_caches = {fetch_poster: poster_cache, fetch_book_cover: cover_cache}
+
+def resolve_images(lookups, deadline: float = IMAGE_FETCH_DEADLINE, max_fetches: int = None):
+    """Runs many (fetch function, key) image lookups concurrently and returns their URLs in order.
+
+    Lookups are deduplicated and run on a shared, bounded thread pool, so a response waits for its
+    slowest single lookup rather than the sum of them. Anything still pending at the deadline gets a
+    placeholder; it keeps running and lands in the cache for the next request. None lookups give None.
+
+    With `max_fetches` (large batch requests), cached URLs are served directly, at most that many
+    uncached lookups are started and the rest get placeholders; those still queued at the deadline
+    are cancelled. One request then can't monopolize the shared pool or the upstream quota.
+    """
+    resolved, futures = {}, {}
+    for lookup in lookups:
+        if lookup is None or lookup in resolved or lookup in futures: continue
+        if max_fetches is not None:
+            cached = _image_caches[lookup[0]].get(lookup[1])
+            if cached is not None:
+                resolved[lookup] = cached
+                continue
+            if len(futures) >= max_fetches:
+                resolved[lookup] = _image_placeholders[lookup[0]]
+                continue
+        futures[lookup] = _image_pool.submit(*lookup)
+    done, pending = wait(futures.values(), timeout=deadline)
+    if max_fetches is not None:
+        for future in pending: future.cancel()
+    
+    for lookup, future in futures.items():
+        ok = future in done and future.exception() is None
+        resolved[lookup] = future.result() if ok else _image_placeholders[lookup[0]]
+    return [None if lookup is None else resolved[lookup] for lookup in lookups]
 
 chat_model = genai.GenerativeModel('gemini-1.5-flash-latest')
 
-def get_movie_recommendations(title: str, df: pd.DataFrame, top_n: int = 5):
-    """Finds movies similar to a given title using hybrid (content + popularity)."""
-    search_term = process_title_for_search(title)
-    movie_row = df[df['search_title'] == search_term]
-    if movie_row.empty: return pd.DataFrame()
-    
-    query_embedding = movie_row['embedding'].iloc[0]
-    query_embedding = np.array(query_embedding).reshape(1, -1)
-    all_embeddings = np.stack(df['embedding'].values)
-    similarities = cosine_similarity(query_embedding, all_embeddings).flatten()
+def get_similar_items(item_index: int, df: pd.DataFrame, top_n: int = 5):
+    """Finds the items most similar to an already-resolved catalog row using hybrid (content + popularity).
+
+    Read from the catalog's precomputed neighbour table when there is one deep enough; otherwise scanned.
+    """
+    name = _catalog_name(df)
+    neighbors = _cache.get(f"{name}_neighbors") if name else None
+    top_indices = neighbors.neighbors(item_index, top_n) if neighbors is not None else None
+    if top_indices is not None:
+        return df.iloc[top_indices]
+
+    all_embeddings, _ = get_catalog_arrays(df)
     
     # Hybrid: Combine with popularity (tuned for more personalization)
-    alpha = 0.8  # Weight for content similarity
-    beta = 0.2   # Weight for popularity
-    hybrid_scores = alpha * similarities + beta * df['pop_norm'].values
-    
-    original_movie_index = movie_row.index[0]
-    all_top_indices = np.argsort(hybrid_scores)[::-1][:top_n + 5]
-    top_indices = [idx for idx in all_top_indices if idx != original_movie_index][:top_n]
+    top_indices, _ = rank_catalog(all_embeddings[item_index], df, top_n, exclude={item_index})
     return df.iloc[top_indices]
 
+def get_movie_recommendations(title: str, df: pd.DataFrame, top_n: int = 5):
+    """Finds movies similar to a given title using hybrid (content + popularity)."""
+    original_movie_index = find_title(title, df)
+    if original_movie_index is None: return pd.DataFrame()
+    return get_similar_items(original_movie_index, df, top_n)
+
 def get_book_recommendations(title: str, df: pd.DataFrame, top_n: int = 5):
     """Finds books similar to a given title using hybrid (content + popularity)."""
-    search_term = process_title_for_search(title)
-    
-    # Use .str.contains() for a partial match instead of an exact match (==)
-    book_row = df[df['search_title'].str.contains(search_term, na=False)]
-    
-    if book_row.empty:
-        return pd.DataFrame()
-
-    # If multiple books match, we'll just use the first one found.
-    first_match = book_row.iloc[0]
-    query_embedding = first_match['embedding']
-    
-    query_embedding = np.array(query_embedding).reshape(1, -1)
-    all_embeddings = np.stack(df['embedding'].values)
-    similarities = cosine_similarity(query_embedding, all_embeddings).flatten()
-    
-    # Hybrid: Combine with popularity (tuned for more personalization)
-    alpha = 0.8  # Weight for content similarity
-    beta = 0.2   # Weight for popularity
-    hybrid_scores = alpha * similarities + beta * df['pop_norm'].values
-    
-    original_book_index = first_match.name
-    all_top_indices = np.argsort(hybrid_scores)[::-1][:top_n + 5]
-    top_indices = [idx for idx in all_top_indices if idx != original_book_index][:top_n]
-    return df.iloc[top_indices]
+    # Partial match instead of an exact match; if multiple books match, we use the first one found.
+    original_book_index = find_title(title, df, partial=True)
+    if original_book_index is None: return pd.DataFrame()
+    return get_similar_items(original_book_index, df, top_n)
+
+def get_batch_recommendations(seeds: list, df: pd.DataFrame, item_type: str, top_n: int = 5):
+    """Recommendations for many seeds in one pass: one results frame per seed, or None if it didn't resolve.
+
+    A seed is a title (like get_movie_recommendations/get_book_recommendations) or a list of
+    favorite titles (like get_user_recommendations). All resolved seeds are scored together with
+    batch_top_k, so the catalog is read once per tile instead of once per seed. Batch scoring is
+    always exact, whatever the search mode.
+    """
+    all_embeddings, pop_norm = get_catalog_arrays(df)
+    queries, excludes, positions = [], [], []
+    for position, seed in enumerate(seeds):
+        titles = [seed] if isinstance(seed, str) else seed
+        rows = {row for row in (find_item(title, df, item_type) for title in titles) if row is not None}
+        if not rows: continue
+        queries.append(np.mean(all_embeddings[sorted(rows)], axis=0))
+        excludes.append(rows)
+        positions.append(position)
+
+    results = [None] * len(seeds)
+    if not queries: return results
+    top_indices = batch_top_k(np.stack(queries), all_embeddings, pop_norm, top_n, excludes, tile_bytes=BATCH_TILE_MB * 2**20)
+    for position, indices in zip(positions, top_indices):
+        results[position] = df.iloc[indices]
+    return results
 
  
 def get_recommendation_explanation(original_movie: str, recommended_movie: str):
     """Generates a brief explanation, using a cache to avoid repeat API calls."""
     cache_key = f"exp_{original_movie}_{recommended_movie}"
-    if cache_key in _cache:
+    cached = explanation_cache.get(cache_key)
+    if cached is not None:
         print(f"Returning cached explanation for '{original_movie}'.")
-        return _cache[cache_key]
+        return cached
     
     prompt = f"You are a friendly movie expert. In one concise sentence, explain why someone who liked '{original_movie}' might also enjoy '{recommended_movie}'."
     try:
         response = chat_model.generate_content(prompt)
         explanation = response.text
-        _cache[cache_key] = explanation # Save to cache
+        explanation_cache.put(cache_key, explanation) # Save to cache
         return explanation
     except Exception as e:
         return f"Could not generate explanation: {e}"
 
 # --- THIS IS THE NEW, UNIFIED EXPLANATION FUNCTION ---
+def generate_explanation(original_item: str, recommended_item: str, item_type: str = 'movie', multiple: bool = False):
+    """Generates (and caches) a brief explanation for a recommendation, for any item type; LLM errors propagate."""
+    return explanations.generate_explanation(chat_model, explanation_cache, original_item, recommended_item, item_type, multiple)
+
 def get_explanation(original_item: str, recommended_item: str, item_type: str = 'movie', multiple: bool = False):
-    """Generates a brief explanation for a recommendation, for any item type."""
-    cache_key = f"exp_{item_type}_{original_item}_{recommended_item}"
-    if cache_key in _cache:
-        return _cache[cache_key]
-    
-    # Create a different prompt based on the item type
-    the_type = 'book' if item_type == 'book' else 'movie'
-    expert = 'book' if item_type == 'book' else 'movie'
-    liked = f"{the_type}s like" if multiple else f"the {the_type}"
-    
-    prompt = f"You are a friendly {expert} expert. In a detailed paragraph of 30-35 words, explain why someone who liked {liked} '{original_item}' would also enjoy the {the_type} '{recommended_item}'."
-        
+    """Generates a brief explanation for a recommendation, or an error message in its place."""
     try:
-        response = chat_model.generate_content(prompt)
-        explanation = response.text
-        _cache[cache_key] = explanation
-        return explanation
+        return generate_explanation(original_item, recommended_item, item_type, multiple)
     except Exception as e:
         return f"Could not generate explanation: {e}"
 
+def request_explanation(original_item: str, recommended_item: str, item_type: str = 'movie', multiple: bool = False,
+                        mode: Optional[str] = None):
+    """Returns (explanation, explanation_id); exactly one is set.
+
+    Inline mode generates the explanation before returning. Deferred mode hands the LLM call to the
+    background pool and only waits EXPLANATION_INLINE_WAIT for it, returning a ticket id otherwise;
+    a failed LLM call then shows up as a "failed" ticket instead of an error message posing as the explanation.
+    """
+    if (mode or EXPLANATION_MODE) != "deferred":
+        return get_explanation(original_item, recommended_item, item_type, multiple), None
+    return explanation_jobs.request(explanation_key(original_item, recommended_item, item_type),
+                                    lambda: generate_explanation(original_item, recommended_item, item_type, multiple),
+                                    EXPLANATION_INLINE_WAIT)
+
+def explanation_status(explanation_id: str, wait: float = 0.0):
+    """The /explanations body for a ticket, waiting up to `wait` seconds while it is still pending."""
+    status, value = explanation_jobs.status(explanation_id, timeout=wait)
+    if status == "done": return {"status": status, "explanation": value}
+    if status == "failed": return {"status": status, "error": value}
+    return {"status": status}
+
 class VibeRequest(BaseModel):
     vibe_text: str
     top_n: Optional[int] = 5
 
-def find_movies_by_vibe(vibe_text: str, df: pd.DataFrame, top_n: int = 5):
-    """Finds movies that match a text description using embeddings + popularity boost, with fallback to keyword search."""
-    # Try embedding-based search first
+def normalize_vibe(vibe_text: str):
+    """Case, width and whitespace variants of a vibe map to one string (and so one embedding)."""
+    return " ".join(unicodedata.normalize("NFKC", vibe_text).casefold().split())
+
+def embed_vibe(vibe_text: str, cached_only: bool = False):
+    """Returns the float32 query embedding for a vibe, from the cache or a single coalesced embed call.
+
+    Keyed on the model and the normalized text; concurrent requests for the same uncached vibe
+    share one upstream call. Embed errors propagate (and are not cached). With `cached_only`,
+    returns None instead of calling upstream.
+    """
+    vibe = normalize_vibe(vibe_text)
+    cache_key = f"{VIBE_EMBEDDING_MODEL}:{vibe}"
+
+    def embed():
+        # Filled by a call that finished just before this one started
+        cached = vibe_embedding_cache.get(cache_key) if cache_key in vibe_embedding_cache else None
+        if cached is not None: return cached
+        prompt = f"Represent this movie vibe for semantic search: {vibe}"
+        response = genai.embed_content(model=VIBE_EMBEDDING_MODEL, content=prompt, request_options={"timeout": VIBE_EMBED_TIMEOUT})
+        embedding = np.asarray(response['embedding'], dtype=np.float32)
+        encoded = base64.b64encode(embedding.tobytes()).decode("ascii")  # Compact in memory and in the JSON store
+        vibe_embedding_cache.put(cache_key, encoded)
+        return encoded
+
+    encoded = vibe_embedding_cache.get(cache_key)
+    if encoded is None:
+        if cached_only: return None
+        encoded = vibe_embed_flight.do(cache_key, embed)
+    return np.frombuffer(base64.b64decode(encoded), dtype=np.float32)
+
+def keyword_vibe_search(vibe_text: str, df: pd.DataFrame, top_n: int = 5):
+    """Local lexical search: BM25 over title and genres (or authors) blended with popularity.
+
+    Only the postings of the query's words are read; if none of them occur, the most popular items are returned.
+    """
+    _, pop_norm = get_catalog_arrays(df)
+    top_indices, _ = get_lexical_index(df).search(vibe_text, pop_norm, top_n)
+    if not len(top_indices):
+        # Even broader fallback: the most popular items
+        top_indices = top_k_indices(pop_norm, top_n)
+    return df.iloc[top_indices]
+
+def semantic_vibe_search(vibe_text: str, df: pd.DataFrame, top_n: int = 5):
+    """Embedding search for a vibe: query embedding (cached, see embed_vibe) ranked with the popularity boost."""
+    started = time.perf_counter()
     try:
-        embedding_model = 'models/embedding-001'  # Correct model name for genai
-        prompt = f"Represent this movie vibe for semantic search: {vibe_text}"
-        embedding = genai.embed_content(model=embedding_model, content=prompt)
-        query_embedding = embedding['embedding']
-        query_embedding = np.array(query_embedding).reshape(1, -1)
-        all_embeddings = np.stack(df['embedding'].values)
-        similarities = cosine_similarity(query_embedding, all_embeddings).flatten()
-        
-        # Hybrid boost for vibe (content + popularity, tuned)
-        alpha = 0.8
-        beta = 0.2
-        hybrid_scores = alpha * similarities + beta * df['pop_norm'].values
-        
-        top_indices = np.argsort(hybrid_scores)[::-1][:top_n]
-        return df.iloc[top_indices]
-    except Exception as e:
-        print(f"Embedding failed (likely quota): {str(e)}. Falling back to keyword search.")
-        # Fallback: Keyword search on title and genres, sorted by popularity
-        mask = (
-            df['title'].str.contains(vibe_text, case=False, na=False) |
-            df['genres'].str.contains(vibe_text, case=False, na=False)
-        )
-        fallback_df = df[mask].copy()
-        if fallback_df.empty:
-            # Even broader fallback: sort all by popularity
-            fallback_df = df.copy()
-        # Sort by pop_norm descending
-        fallback_df = fallback_df.sort_values('pop_norm', ascending=False).head(top_n)
-        return fallback_df
+        top_indices, _ = rank_catalog(embed_vibe(vibe_text), df, top_n)
+    except Exception:
+        vibe_metrics.incr("semantic_errors")
+        raise
+    finally:
+        vibe_metrics.record("semantic", time.perf_counter() - started)
+    return df.iloc[top_indices]
+
+_vibe_pool = ThreadPoolExecutor(max_workers=VIBE_WORKERS, thread_name_prefix="vibe-embed")
+_vibe_slots = threading.BoundedSemaphore(VIBE_WORKERS)  # Held per submitted search, so none ever waits in the pool's queue
+
+def find_movies_by_vibe(vibe_text: str, df: pd.DataFrame, top_n: int = 5, deadline: float = None):
+    """Finds movies that match a text description; returns (results, "semantic" or "keyword").
+
+    A vibe whose embedding is cached is answered semantically right away. Otherwise the embedding
+    search runs on a bounded pool while the local keyword search runs here; the semantic result is
+    used if it arrives within `deadline` seconds (VIBE_DEADLINE), else the keyword result is. A late
+    embedding still lands in the cache for the next request. While every pool worker is busy (e.g. the
+    embedding upstream hangs), no search is queued behind them: the keyword result is served at once.
+    """
+    deadline = VIBE_DEADLINE if deadline is None else deadline
+    started = time.perf_counter()
+    if embed_vibe(vibe_text, cached_only=True) is not None:
+        served_by, results_df = "semantic", semantic_vibe_search(vibe_text, df, top_n)
+    elif not _vibe_slots.acquire(blocking=False):
+        vibe_metrics.incr("semantic_skipped")
+        served_by, results_df = "keyword", keyword_vibe_search(vibe_text, df, top_n)
+    else:
+        semantic = _vibe_pool.submit(semantic_vibe_search, vibe_text, df, top_n)
+        semantic.add_done_callback(lambda _: _vibe_slots.release())
+        keyword_started = time.perf_counter()
+        keyword_df = keyword_vibe_search(vibe_text, df, top_n)
+        vibe_metrics.record("keyword", time.perf_counter() - keyword_started)
+        try:
+            served_by, results_df = "semantic", semantic.result(timeout=max(0.0, deadline - (time.perf_counter() - started)))
+        except FutureTimeoutError:
+            semantic.cancel()  # Only stops it if it never started; a running embed finishes and fills the cache
+            print(f"Embedding search missed the {deadline}s deadline. Serving keyword results.")
+            vibe_metrics.incr("semantic_timeouts")
+            served_by, results_df = "keyword", keyword_df
+        except Exception as e:
+            print(f"Embedding failed (likely quota): {str(e)}. Falling back to keyword search.")
+            served_by, results_df = "keyword", keyword_df
+    vibe_metrics.incr(f"served_by_{served_by}")
+    vibe_metrics.record(f"served_by_{served_by}", time.perf_counter() - started)
+    return results_df, served_by
 
 def get_user_recommendations(titles: List[str], df: pd.DataFrame, item_type: str, top_n: int = 5):
     if not titles:
@@ -287,29 +544,22 @@ def get_user_recommendations(titles: List[str], df: pd.DataFrame, item_type: str
         # Could fallback to global popular items; here, return empty for now
         return pd.DataFrame()
     
+    all_embeddings, _ = get_catalog_arrays(df)
     embeddings = []
+    seen = set()
     for title in titles:
-        search_term = process_title_for_search(title)
-        if item_type == 'movie':
-            row = df[df['search_title'] == search_term]
-        else:  # book
-            row = df[df['search_title'].str.contains(search_term, na=False)]
-        if not row.empty:
-            embeddings.append(np.array(row.iloc[0]['embedding']))
+        row_index = find_item(title, df, item_type)  # Books use partial matching
+        if row_index is not None:
+            embeddings.append(all_embeddings[row_index])
+            seen.add(row_index)
     
     if not embeddings:
         return pd.DataFrame()
     
-    avg_embedding = np.mean(embeddings, axis=0).reshape(1, -1)
-    all_embeddings = np.stack(df['embedding'].values)
-    similarities = cosine_similarity(avg_embedding, all_embeddings).flatten()
+    avg_embedding = np.mean(embeddings, axis=0)
     
     # Hybrid: Combine with popularity (tuned)
-    alpha = 0.8
-    beta = 0.2
-    hybrid_scores = alpha * similarities + beta * df['pop_norm'].values
-    
-    top_indices = np.argsort(hybrid_scores)[::-1][:top_n]
+    top_indices, _ = rank_catalog(avg_embedding, df, top_n, exclude=seen)
     return df.iloc[top_indices]
 
 # NEW: Cross-domain user recommendations (interlinks movies and books)
@@ -320,44 +570,39 @@ class MixedUserRequest(BaseModel):
 
 def get_mixed_user_recommendations(request: MixedUserRequest, movie_df: pd.DataFrame, book_df: pd.DataFrame, top_n: int = 5):
     """Computes a unified query embedding from both movie and book favorites, then recommends top items across both domains using hybrid scoring."""
-    movie_embeddings = []
+    movie_all_embeddings, _ = get_catalog_arrays(movie_df)
+    book_all_embeddings, _ = get_catalog_arrays(book_df)
+
+    movie_embeddings, seen_movies = [], set()
     for title in request.movie_titles:
-        search_term = process_title_for_search(title)
-        row = movie_df[movie_df['search_title'] == search_term]
-        if not row.empty:
-            movie_embeddings.append(np.array(row.iloc[0]['embedding']))
+        row_index = find_title(title, movie_df)
+        if row_index is not None:
+            movie_embeddings.append(movie_all_embeddings[row_index])
+            seen_movies.add(row_index)
 
-    book_embeddings = []
+    book_embeddings, seen_books = [], set()
     for title in request.book_titles:
-        search_term = process_title_for_search(title)
-        row = book_df[book_df['search_title'].str.contains(search_term, na=False)]
-        if not row.empty:
-            book_embeddings.append(np.array(row.iloc[0]['embedding']))
+        row_index = find_title(title, book_df, partial=True)
+        if row_index is not None:
+            book_embeddings.append(book_all_embeddings[row_index])
+            seen_books.add(row_index)
 
     all_embeddings = movie_embeddings + book_embeddings
     if not all_embeddings:
         return pd.DataFrame()
 
     # Average all embeddings for a unified query
-    query_embedding = np.mean(all_embeddings, axis=0).reshape(1, -1)
+    query_embedding = normalize_query(np.mean(all_embeddings, axis=0))
 
     # Compute hybrid similarities for movies
-    movie_all_embeddings = np.stack(movie_df['embedding'].values)
-    movie_similarities = cosine_similarity(query_embedding, movie_all_embeddings).flatten()
-    alpha = 0.8
-    beta = 0.2
-    movie_hybrid = alpha * movie_similarities + beta * movie_df['pop_norm'].values
-    movie_top_indices = np.argsort(movie_hybrid)[::-1][:top_n // 2 + 1]
+    movie_top_indices, movie_hybrid = rank_catalog(query_embedding, movie_df, top_n // 2 + 1, exclude=seen_movies)
 
     # Compute hybrid similarities for books
-    book_all_embeddings = np.stack(book_df['embedding'].values)
-    book_similarities = cosine_similarity(query_embedding, book_all_embeddings).flatten()
-    book_hybrid = alpha * book_similarities + beta * book_df['pop_norm'].values
-    book_top_indices = np.argsort(book_hybrid)[::-1][:top_n // 2 + 1]
+    book_top_indices, book_hybrid = rank_catalog(query_embedding, book_df, top_n // 2 + 1, exclude=seen_books)
 
     # Get candidates with hybrid scores
-    movie_candidates = [(movie_hybrid[i], i, movie_df.iloc[i]) for i in movie_top_indices]
-    book_candidates = [(book_hybrid[i], i, book_df.iloc[i]) for i in book_top_indices]
+    movie_candidates = [(score, i, movie_df.iloc[i]) for i, score in zip(movie_top_indices, movie_hybrid)]
+    book_candidates = [(score, i, book_df.iloc[i]) for i, score in zip(book_top_indices, book_hybrid)]
 
     # Combine and sort by hybrid similarity
     all_candidates = movie_candidates + book_candidates
@@ -381,57 +626,98 @@ class VibeRequest(BaseModel):
     vibe_text: str
     top_n: Optional[int] = 5
 
+class BatchRequest(BaseModel):
+    item_type: str = 'movie'  # 'movie', 'book' or 'music'
+    seeds: List[Union[str, List[str]]]  # A title, or a user profile given as a list of favorite titles
+    top_n: Optional[int] = 5
+
 # --- API SETUP ---
 app = FastAPI()
 movie_df = load_movie_data()
 book_df = load_book_data()
+music_df = load_music_data()
+print(f"Warmed caches from disk: {caches.warm()}")
 origins = ["*"]
 app.add_middleware(CORSMiddleware, allow_origins=origins, allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
 # --- API ENDPOINTS ---
+# Recommendation responses carry display fields only; ?fields=a,b narrows them, ?include_embedding=true adds vectors
+FIELDS_QUERY = Query(None, description="Comma-separated response fields (default: all display fields)")
+EXPLAIN_QUERY = Query(None, pattern="^(inline|deferred)$", description="Overrides EXPLANATION_MODE for this request")
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Recommender API!"}
 
+@app.get("/cache/stats")
+def cache_stats_api():
+    """Hit/miss/eviction counters for each cache namespace."""
+    return caches.stats()
+
+@app.get("/upstreams/stats")
+def upstream_stats_api():
+    """Call, failure, rate-limit and circuit-breaker state for each external metadata upstream."""
+    return {client.name: client.stats() for client in (tmdb_client, google_books_client)}
+
+@app.get("/explanations/{explanation_id}", responses={200: {"model": ExplanationStatus}})
+def get_explanation_api(explanation_id: str, wait: float = Query(0.0, ge=0, le=30)):
+    """Polls a deferred explanation; `wait` long-polls for up to that many seconds while it is pending."""
+    return explanation_status(explanation_id, wait)
+
+@app.get("/explanations/{explanation_id}/stream")
+def stream_explanation_api(explanation_id: str):
+    """Server-sent events: keep-alive comments while pending, then one done/failed/unknown event."""
+    def events():
+        while True:
+            body = explanation_status(explanation_id, wait=15.0)
+            if body["status"] != "pending": break
+            yield ": pending\n\n"
+        yield f"event: {body['status']}\ndata: {json.dumps(body)}\n\n"
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.get("/search/movie/{query}")
 def search_movies_api(query: str):
-    """Finds movies by a partial match for autocomplete."""
+    """Autocompletes movie titles, most popular first, tolerating small typos."""
     if len(query) < 3: return {"results": []}
-    search_term = process_title_for_search(query)
-    matches = movie_df[movie_df['search_title'].str.contains(search_term, na=False)].head(10)
-    return {"results": matches['title'].tolist()}
+    rows = _cache["movies_autocomplete"].complete(process_title_for_search(query), limit=10)
+    return {"results": movie_df['title'].iloc[rows].tolist()}
 
 @app.get("/search/book/{query}")
 def search_books_api(query: str):
-    """Finds books by a partial match for autocomplete."""
+    """Autocompletes book titles, most popular first, tolerating small typos."""
     if len(query) < 3: return {"results": []}
-    search_term = process_title_for_search(query)
-    matches = book_df[book_df['search_title'].str.contains(search_term, na=False)].head(10)
-    return {"results": matches['title'].tolist()}
-
-@app.get("/recommend/movie/{movie_title}")
-def get_movie_recommendations_api(movie_title: str, top_n: int = Query(5, ge=1, le=100)):
-    search_term = process_title_for_search(movie_title)
-    original_movie_df = movie_df[movie_df['search_title'] == search_term]
-    if original_movie_df.empty: return {"error": "Movie not found"}
-    original_title = original_movie_df.iloc[0]['title']
-
-    recommendations_df = get_movie_recommendations(movie_title, movie_df, top_n)
+    rows = _cache["books_autocomplete"].complete(process_title_for_search(query), limit=10)
+    return {"results": book_df['title'].iloc[rows].tolist()}
+
+@app.get("/search/music/{query}")
+def search_music_api(query: str):
+    """Autocompletes tracks by name or artist, most popular first, as "track - artist" strings."""
+    if music_df is None: return {"error": "Music catalog is not available"}
+    if len(query) < 3: return {"results": []}
+    rows = _cache["music_autocomplete"].complete(process_title_for_search(query), limit=10)
+    matches = music_df.iloc[rows]
+    return {"results": [f"{title}{TRACK_SEPARATOR}{artists}" for title, artists in zip(matches['title'], matches['artists'])]}
+
+@app.get("/recommend/movie/{movie_title}", responses={200: {"model": MovieRecommendationsResponse}})
+def get_movie_recommendations_api(movie_title: str, top_n: int = Query(5, ge=1, le=100), fields: Optional[str] = FIELDS_QUERY, include_embedding: bool = False,
+                                  explain: Optional[str] = EXPLAIN_QUERY):
+    original_movie_index = find_title(movie_title, movie_df)
+    if original_movie_index is None: return {"error": "Movie not found"}
+    original_title = movie_df.at[original_movie_index, 'title']
+
+    recommendations_df = get_similar_items(original_movie_index, movie_df, top_n)
     if recommendations_df.empty: return {"error": "Could not find recommendations for this movie."} 
     
     results_df = recommendations_df.copy()
-    results_df['posterUrl'] = results_df['tmdbId'].apply(fetch_poster)
-    results_df['embedding'] = results_df['embedding'].apply(list)
-    results_df = results_df.replace({np.nan: None})
+    results_df['posterUrl'] = resolve_images([(fetch_poster, int(tmdb_id)) for tmdb_id in results_df['tmdbId']])
     
     top_rec_title = results_df.iloc[0]['title']
-    explanation_text = get_explanation(original_title, top_rec_title, item_type='movie')
+    explanation_text, explanation_id = request_explanation(original_title, top_rec_title, item_type='movie', mode=explain)
     
-    recommendations_json = results_df.to_dict('records')
-    return {"recommendations": recommendations_json, "explanation": explanation_text}
+    return recommendation_response(results_df, 'movie', explanation_text, fields, include_embedding, catalog_embedding_rows, explanation_id)
 
-@app.post("/recommend/user/movie")
-def get_user_movie_recommendations_api(request: TitlesRequest):
+@app.post("/recommend/user/movie", responses={200: {"model": MovieRecommendationsResponse}})
+def get_user_movie_recommendations_api(request: TitlesRequest, fields: Optional[str] = FIELDS_QUERY, include_embedding: bool = False,
+                                       explain: Optional[str] = EXPLAIN_QUERY):
     titles = request.titles
     top_n = request.top_n
     if not titles:
@@ -441,20 +727,18 @@ def get_user_movie_recommendations_api(request: TitlesRequest):
     if recommendations_df.empty: return {"error": "Could not find recommendations based on your favorites."} 
     
     results_df = recommendations_df.copy()
-    results_df['posterUrl'] = results_df['tmdbId'].apply(fetch_poster)
-    results_df['embedding'] = results_df['embedding'].apply(list)
-    results_df = results_df.replace({np.nan: None})
+    results_df['posterUrl'] = resolve_images([(fetch_poster, int(tmdb_id)) for tmdb_id in results_df['tmdbId']])
     
     top_rec_title = results_df.iloc[0]['title']
     original = ", ".join(titles) if len(titles) > 1 else titles[0]
     multiple = len(titles) > 1
-    explanation_text = get_explanation(original, top_rec_title, item_type='movie', multiple=multiple)
+    explanation_text, explanation_id = request_explanation(original, top_rec_title, item_type='movie', multiple=multiple, mode=explain)
     
-    recommendations_json = results_df.to_dict('records')
-    return {"recommendations": recommendations_json, "explanation": explanation_text}
+    return recommendation_response(results_df, 'movie', explanation_text, fields, include_embedding, catalog_embedding_rows, explanation_id)
 
-@app.post("/recommend/user/book")
-def get_user_book_recommendations_api(request: TitlesRequest):
+@app.post("/recommend/user/book", responses={200: {"model": BookRecommendationsResponse}})
+def get_user_book_recommendations_api(request: TitlesRequest, fields: Optional[str] = FIELDS_QUERY, include_embedding: bool = False,
+                                      explain: Optional[str] = EXPLAIN_QUERY):
     titles = request.titles
     top_n = request.top_n
     if not titles:
@@ -464,78 +748,148 @@ def get_user_book_recommendations_api(request: TitlesRequest):
     if recommendations_df.empty: return {"error": "Could not find recommendations based on your favorites."}
     
     results_df = recommendations_df.copy()
-    results_df['coverUrl'] = results_df['isbn'].apply(fetch_book_cover)
-    results_df['embedding'] = results_df['embedding'].apply(list)
-    results_df = results_df.replace({np.nan: None})
+    results_df['coverUrl'] = resolve_images([(fetch_book_cover, str(isbn)) for isbn in results_df['isbn']])
     
     top_rec_title = results_df.iloc[0]['title']
     original = ", ".join(titles) if len(titles) > 1 else titles[0]
     multiple = len(titles) > 1
-    explanation_text = get_explanation(original, top_rec_title, item_type='book', multiple=multiple)
+    explanation_text, explanation_id = request_explanation(original, top_rec_title, item_type='book', multiple=multiple, mode=explain)
     
-    recommendations_json = results_df.to_dict('records')
-    return {"recommendations": recommendations_json, "explanation": explanation_text}
+    return recommendation_response(results_df, 'book', explanation_text, fields, include_embedding, catalog_embedding_rows, explanation_id)
 
 # NEW: Mixed user recommendations endpoint for interlinking
-@app.post("/recommend/user/mixed")
-def get_mixed_user_recommendations_api(request: MixedUserRequest):
+@app.post("/recommend/user/mixed", responses={200: {"model": MixedRecommendationsResponse}})
+def get_mixed_user_recommendations_api(request: MixedUserRequest, fields: Optional[str] = FIELDS_QUERY, include_embedding: bool = False,
+                                       explain: Optional[str] = EXPLAIN_QUERY):
     top_n = request.top_n
     recommendations_df = get_mixed_user_recommendations(request, movie_df, book_df, top_n)
     if recommendations_df.empty: return {"error": "Could not find recommendations based on your favorites."}
     
     # Prepare results with appropriate images
     results_df = recommendations_df.copy()
-    results_df['posterUrl'] = results_df.apply(lambda row: fetch_poster(row['tmdbId']) if row['category'] == 'movie' else None, axis=1)
-    results_df['coverUrl'] = results_df.apply(lambda row: fetch_book_cover(row['isbn']) if row['category'] == 'book' else None, axis=1)
-    results_df['embedding'] = results_df['embedding'].apply(list)
-    results_df = results_df.replace({np.nan: None})
+    # One concurrent pass for both kinds of image
+    is_movie = (results_df['category'] == 'movie').tolist()
+    images = resolve_images(
+        [(fetch_poster, int(row['tmdbId'])) if movie else (fetch_book_cover, str(row['isbn']))
+         for movie, (_, row) in zip(is_movie, results_df.iterrows())])
+    results_df['posterUrl'] = [url if movie else None for movie, url in zip(is_movie, images)]
+    results_df['coverUrl'] = [None if movie else url for movie, url in zip(is_movie, images)]
     
     # Explanation based on top rec
     top_rec_title = results_df.iloc[0]['title']
     original = f"{'movies' if request.movie_titles else ''} {'and' if request.movie_titles and request.book_titles else ''} {'books' if request.book_titles else ''} like {', '.join(request.movie_titles + request.book_titles)}"
     multiple = bool(request.movie_titles or request.book_titles)
     item_type = results_df.iloc[0]['category']
-    explanation_text = get_explanation(original, top_rec_title, item_type=item_type, multiple=multiple)
+    explanation_text, explanation_id = request_explanation(original, top_rec_title, item_type=item_type, multiple=multiple, mode=explain)
     
-    recommendations_json = results_df.to_dict('records')
-    return {"recommendations": recommendations_json, "explanation": explanation_text}
+    return recommendation_response(results_df, 'mixed', explanation_text, fields, include_embedding, catalog_embedding_rows, explanation_id)
 
-@app.post("/vibe")
-def find_movies_by_vibe_api(request: VibeRequest):
+@app.post("/vibe", responses={200: {"model": MovieRecommendationsResponse}})
+def find_movies_by_vibe_api(request: VibeRequest, fields: Optional[str] = FIELDS_QUERY, include_embedding: bool = False):
     """Main endpoint for vibe-based search."""
     top_n = request.top_n
-    results_df = find_movies_by_vibe(request.vibe_text, movie_df, top_n)
+    results_df, served_by = find_movies_by_vibe(request.vibe_text, movie_df, top_n)
     if results_df.empty: return {"error": "Could not find any matches for that description."}
     
     response_df = results_df.copy()
-    response_df['posterUrl'] = response_df['tmdbId'].apply(fetch_poster)
-    response_df['embedding'] = response_df['embedding'].apply(list)
-    response_df = response_df.replace({np.nan: None})
-    return {"recommendations": response_df.to_dict('records')}
-
-@app.get("/recommend/book/{book_title}")
-def get_book_recommendations_api(book_title: str, top_n: int = Query(5, ge=1, le=100)):
-    search_term = process_title_for_search(book_title)
-    # FIXED: Use contains for partial match consistency with books data
-    original_book_df = book_df[book_df['search_title'].str.contains(search_term, na=False)]
-    if original_book_df.empty: return {"error": "Book not found"}
-    # Take first match if multiple
-    original_title = original_book_df.iloc[0]['title']
-    
-    recommendations_df = get_book_recommendations(book_title, book_df, top_n)
+    response_df['posterUrl'] = resolve_images([(fetch_poster, int(tmdb_id)) for tmdb_id in response_df['tmdbId']])
+    return recommendation_response(response_df, 'movie', fields=fields, include_embedding=include_embedding,
+                                   embedding_rows=catalog_embedding_rows, served_by=served_by)
+
+@app.get("/vibe/stats")
+def vibe_stats_api():
+    """Which path served /vibe requests, per-path latency percentiles, and embed-call coalescing."""
+    return {**vibe_metrics.stats(), "embed_calls": vibe_embed_flight.stats()}
+
+@app.get("/recommend/book/{book_title}", responses={200: {"model": BookRecommendationsResponse}})
+def get_book_recommendations_api(book_title: str, top_n: int = Query(5, ge=1, le=100), fields: Optional[str] = FIELDS_QUERY, include_embedding: bool = False,
+                                 explain: Optional[str] = EXPLAIN_QUERY):
+    # FIXED: Use partial match consistency with books data; takes first match if multiple
+    original_book_index = find_title(book_title, book_df, partial=True)
+    if original_book_index is None: return {"error": "Book not found"}
+    original_title = book_df.at[original_book_index, 'title']
+    
+    recommendations_df = get_similar_items(original_book_index, book_df, top_n)
     if recommendations_df.empty: return {"error": "Could not find recommendations for this book."}
     
     results_df = recommendations_df.copy()
-    results_df['coverUrl'] = results_df['isbn'].apply(fetch_book_cover)
-    results_df['embedding'] = results_df['embedding'].apply(list)
-    results_df = results_df.replace({np.nan: None})
+    results_df['coverUrl'] = resolve_images([(fetch_book_cover, str(isbn)) for isbn in results_df['isbn']])
     
     top_rec_title = results_df.iloc[0]['title']
-    explanation_text = get_explanation(original_title, top_rec_title, item_type='book')
+    explanation_text, explanation_id = request_explanation(original_title, top_rec_title, item_type='book', mode=explain)
     
-    recommendations_json = results_df.to_dict('records')
-    return {"recommendations": recommendations_json, "explanation": explanation_text}
+    return recommendation_response(results_df, 'book', explanation_text, fields, include_embedding, catalog_embedding_rows, explanation_id)
+
+@app.get("/recommend/music/{track}", responses={200: {"model": MusicRecommendationsResponse}})
+def get_music_recommendations_api(track: str, top_n: int = Query(5, ge=1, le=100), fields: Optional[str] = FIELDS_QUERY, include_embedding: bool = False,
+                                  explain: Optional[str] = EXPLAIN_QUERY):
+    """Recommends tracks similar to a track name or a "track - artist" string."""
+    if music_df is None: return {"error": "Music catalog is not available"}
+    original_track_index = find_track(track)
+    if original_track_index is None: return {"error": "Track not found"}
+    original_title = explanation_label(music_df.loc[original_track_index], 'music')
+
+    results_df = get_similar_items(original_track_index, music_df, top_n)
+    if results_df.empty: return {"error": "Could not find recommendations for this track."}
+
+    top_rec = results_df.iloc[0]
+    explanation_text, explanation_id = request_explanation(original_title, explanation_label(top_rec, 'music'), item_type='music', mode=explain)
+
+    return recommendation_response(results_df, 'music', explanation_text, fields, include_embedding, catalog_embedding_rows, explanation_id)
+
+@app.post("/recommend/user/music", responses={200: {"model": MusicRecommendationsResponse}})
+def get_user_music_recommendations_api(request: TitlesRequest, fields: Optional[str] = FIELDS_QUERY, include_embedding: bool = False,
+                                       explain: Optional[str] = EXPLAIN_QUERY):
+    if music_df is None: return {"error": "Music catalog is not available"}
+    titles = request.titles
+    top_n = request.top_n
+    if not titles:
+        return {"error": "No titles provided"}
+
+    results_df = get_user_recommendations(titles, music_df, 'music', top_n)
+    if results_df.empty: return {"error": "Could not find recommendations based on your favorites."}
+
+    top_rec = results_df.iloc[0]
+    original = ", ".join(titles) if len(titles) > 1 else titles[0]
+    multiple = len(titles) > 1
+    explanation_text, explanation_id = request_explanation(original, explanation_label(top_rec, 'music'), item_type='music', multiple=multiple, mode=explain)
+
+    return recommendation_response(results_df, 'music', explanation_text, fields, include_embedding, catalog_embedding_rows, explanation_id)
+
+@app.post("/recommend/batch", responses={200: {"model": BatchRecommendationsResponse}})
+def get_batch_recommendations_api(request: BatchRequest, fields: Optional[str] = FIELDS_QUERY, include_embedding: bool = False,
+                                  include_images: bool = False):
+    """Top-k lists for many seed titles and/or user profiles in one call, in request order.
+
+    No explanations; posters/covers only with ?include_images=true (one concurrent pass for all seeds,
+    starting at most BATCH_MAX_IMAGE_FETCHES uncached lookups; the others get placeholders).
+    """
+    catalogs = {'movie': movie_df, 'book': book_df, 'music': music_df}
+    df = catalogs.get(request.item_type)
+    if df is None: return {"error": f"Unknown or unavailable item type '{request.item_type}'"}
+    if not request.seeds: return {"error": "No seeds provided"}
+    if len(request.seeds) > BATCH_MAX_SEEDS: return {"error": f"At most {BATCH_MAX_SEEDS} seeds per request"}
+    top_n = max(1, min(request.top_n or 5, 100))
+
+    results = get_batch_recommendations(request.seeds, df, request.item_type, top_n)
+    found = [position for position, results_df in enumerate(results) if results_df is not None]
+    if include_images and found and request.item_type != 'music':
+        column, fetch, key_column, key = {'movie': ('posterUrl', fetch_poster, 'tmdbId', int),
+                                          'book': ('coverUrl', fetch_book_cover, 'isbn', str)}[request.item_type]
+        urls = iter(resolve_images([(fetch, key(value)) for position in found for value in results[position][key_column]],
+                                   max_fetches=BATCH_MAX_IMAGE_FETCHES))
+        for position in found:
+            results[position] = results[position].assign(**{column: [next(urls) for _ in range(len(results[position]))]})
+
+    body = []
+    for seed, results_df in zip(request.seeds, results):
+        if results_df is None:
+            body.append({"seed": seed, "recommendations": [], "error": "Not found"})
+        else:
+            records = project_records(results_df, request.item_type, fields, include_embedding, catalog_embedding_rows)
+            body.append({"seed": seed, "recommendations": records})
+    return FastJSONResponse({"results": body})
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run("api:app" if API_WORKERS > 1 else app, host="0.0.0.0", port=8000, workers=API_WORKERS)
@@ -0,0 +1,74 @@
+import numpy as np
+
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+def _ngrams(text: str, n: int):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class Autocomplete:
+    """Typo-tolerant, popularity-ranked autocomplete over a catalog's `search_title` column.
+
+    Rows are relabelled by popularity rank (0 = most popular) so every posting list is already
+    in ranking order: intersecting the trigram lists of a query and verifying the first few hits
+    yields the top matches without sorting. Queries shorter than a trigram are answered from a
+    precomputed table, and when too few titles contain the query verbatim the remaining slots are
+    filled with titles sharing most of its trigrams (so "godfahter" still finds "godfather").
+    """
+
+    def __init__(self, search_titles, pop_norm, limit: int = 10):
+        self.titles = list(search_titles)
+        self.limit = limit
+        # rank -> catalog row, most popular first (stable, so ties keep catalog order)
+        self.rank_to_row = np.argsort(-np.asarray(pop_norm, dtype=np.float64), kind='stable').astype(np.int32)
+
+        grams, short = {}, {}
+        for rank, row in enumerate(self.rank_to_row):
+            title = self.titles[row]
+            for gram in _ngrams(title, 3):
+                grams.setdefault(gram, []).append(rank)
+            for gram in _ngrams(title, 1) | _ngrams(title, 2):
+                hits = short.setdefault(gram, [])
+                if len(hits) < limit: hits.append(rank)
+        self.postings = {gram: np.array(ranks, dtype=np.int32) for gram, ranks in grams.items()}
+        self.short = {gram: np.array(ranks, dtype=np.int32) for gram, ranks in short.items()}
+
+    def complete(self, search_term: str, limit: int = None):
+        """Returns catalog rows of the best matches for a normalized query, most popular first."""
+        limit = limit or self.limit
+        if not search_term:
+            return []
+        if len(search_term) < 3:
+            return self.rank_to_row[self.short.get(search_term, _EMPTY)[:limit]].tolist()
+
+        posting_lists = [self.postings.get(gram, _EMPTY) for gram in _ngrams(search_term, 3)]
+        ranks = self._substring_matches(search_term, posting_lists, limit)
+        if len(ranks) < limit:
+            ranks += [rank for rank in self._fuzzy_matches(posting_lists, limit) if rank not in ranks][:limit - len(ranks)]
+        return self.rank_to_row[np.array(ranks, dtype=np.int32)].tolist()
+
+    def _substring_matches(self, search_term: str, posting_lists, limit: int):
+        posting_lists = sorted(posting_lists, key=len)
+        candidates = posting_lists[0]
+        for postings in posting_lists[1:]:
+            if not len(candidates): break
+            candidates = np.intersect1d(candidates, postings, assume_unique=True)
+        matches = []
+        for rank in candidates:
+            if search_term in self.titles[self.rank_to_row[rank]]:
+                matches.append(int(rank))
+                if len(matches) == limit: break
+        return matches
+
+    def _fuzzy_matches(self, posting_lists, limit: int):
+        """Ranks of titles sharing at least a third of the query's trigrams, best overlap first."""
+        hits = [postings for postings in posting_lists if len(postings)]
+        if not hits:
+            return []
+        ranks, overlap = np.unique(np.concatenate(hits), return_counts=True)
+        keep = overlap >= max(1, len(posting_lists) // 3)
+        ranks, overlap = ranks[keep], overlap[keep]
+        # Most shared trigrams first; np.unique already sorted ties by rank (= popularity)
+        order = np.argsort(-overlap, kind='stable')[:limit]
+        return ranks[order].tolist()
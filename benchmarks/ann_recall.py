@@ -0,0 +1,69 @@
+"""Recall-vs-exact benchmark for the IVF index.
+
+Usage (from the repo root):
+    python benchmarks/ann_recall.py data/movie_embeddings.parquet
+    python benchmarks/ann_recall.py --synthetic 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ann_index import IVFIndex
+from scoring import build_embedding_matrix, normalize_rows
+
+
+def load_matrix(args):
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        # Clustered synthetic data so recall numbers resemble real embeddings more than pure noise
+        centers = rng.normal(size=(256, args.dim)).astype(np.float32)
+        matrix = centers[rng.integers(0, 256, args.synthetic)] + 0.5 * rng.normal(size=(args.synthetic, args.dim)).astype(np.float32)
+        return normalize_rows(matrix)
+    return build_embedding_matrix(pd.read_parquet(args.parquet, columns=['embedding'])['embedding'].values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("parquet", nargs="?", default="data/movie_embeddings.parquet")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N random clustered vectors instead of a parquet file")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    matrix = load_matrix(args)
+    print(f"Catalog: {matrix.shape[0]} x {matrix.shape[1]}")
+
+    start = time.perf_counter()
+    index = IVFIndex.build(matrix)
+    print(f"Built IVF index with {index.n_lists} lists in {time.perf_counter() - start:.2f}s")
+
+    rng = np.random.default_rng(1)
+    queries = matrix[rng.choice(len(matrix), args.queries, replace=False)]
+
+    start = time.perf_counter()
+    exact = [np.argsort(matrix @ q)[::-1][:args.k] for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    print(f"\n{'mode':>12} {'recall@' + str(args.k):>10} {'ms/query':>10} {'scanned':>10}")
+    print(f"{'exact':>12} {1.0:>10.3f} {exact_ms:>10.3f} {len(matrix):>10}")
+
+    for nprobe in args.nprobe:
+        if nprobe > index.n_lists: break
+        hits, scanned = 0, 0
+        start = time.perf_counter()
+        for q, truth in zip(queries, exact):
+            ids, _ = index.search(q, matrix, args.k, nprobe=nprobe)
+            hits += len(np.intersect1d(ids, truth))
+        elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        scanned = int(np.mean([len(index.candidates(q, nprobe)) for q in queries[:20]]))
+        print(f"{'nprobe=' + str(nprobe):>12} {hits / (len(queries) * args.k):>10.3f} {elapsed_ms:>10.3f} {scanned:>10}")
+
+
+if __name__ == "__main__":
+    main()
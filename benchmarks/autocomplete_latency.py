@@ -0,0 +1,85 @@
+"""Latency benchmark for title autocomplete, replaying a query log.
+
+The log is a text file with one raw query per line (what the frontend sends to
+/search/movie/{query}). Without one, a log is synthesized from keystroke prefixes
+of random catalog titles, with a typo injected into every fifth query.
+
+Usage (from the repo root):
+    python benchmarks/autocomplete_latency.py --csv data/movies.csv --log queries.txt
+    python benchmarks/autocomplete_latency.py --csv data/books.csv --pop-column ratings_count
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from autocomplete import Autocomplete
+from title_index import process_title_for_search
+
+
+def synthesize_log(titles, size: int, seed: int = 0):
+    rng = random.Random(seed)
+    log = []
+    while len(log) < size:
+        title = rng.choice(titles)
+        if len(title) < 3: continue
+        query = title[:rng.randint(3, min(len(title), 20))]
+        if len(log) % 5 == 4 and len(query) > 4:
+            i = rng.randrange(1, len(query) - 1)
+            query = query[:i] + query[i + 1] + query[i] + query[i + 2:]  # Swap two letters
+        log.append(query)
+    return log
+
+
+def percentiles(samples_ms):
+    return " ".join(f"p{p}={np.percentile(samples_ms, p):.3f}ms" for p in (50, 95, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default="data/movies.csv")
+    parser.add_argument("--title-column", default="title")
+    parser.add_argument("--pop-column", default=None, help="Popularity column; uniform if omitted")
+    parser.add_argument("--log", default=None, help="Query log, one query per line")
+    parser.add_argument("--queries", type=int, default=5000)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv, on_bad_lines='skip')
+    titles = df[args.title_column].astype(str)
+    search_titles = titles.apply(process_title_for_search)
+    pop = np.log1p(df[args.pop_column].fillna(0).to_numpy(dtype=np.float64)) if args.pop_column else np.zeros(len(df))
+
+    start = time.perf_counter()
+    engine = Autocomplete(search_titles, pop)
+    print(f"Built autocomplete over {len(df)} titles in {time.perf_counter() - start:.2f}s")
+
+    if args.log:
+        with open(args.log) as f:
+            log = [line.strip() for line in f if len(line.strip()) >= 3]
+    else:
+        log = synthesize_log(titles.tolist(), args.queries)
+    normalized = [process_title_for_search(q) for q in log]
+
+    samples = []
+    for term in normalized:
+        start = time.perf_counter()
+        engine.complete(term)
+        samples.append((time.perf_counter() - start) * 1000)
+    print(f"autocomplete  ({len(log)} queries): {percentiles(samples)}")
+
+    # Baseline: the old str.contains scan + first 10 in file order, on a subset to keep it quick
+    samples = []
+    for term in normalized[:500]:
+        start = time.perf_counter()
+        search_titles[search_titles.str.contains(term, na=False)].head(10)
+        samples.append((time.perf_counter() - start) * 1000)
+    print(f"str.contains  ({len(samples)} queries): {percentiles(samples)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Throughput of batch recommendation scoring vs. one catalog scan per seed.
+
+    per-seed  hybrid_scores + top_k_indices once per seed (what N calls to /recommend/movie do)
+    batch     batch_top_k: all seeds scored as tiled (tile x N) matrix products
+
+Usage (from the repo root):
+    python benchmarks/batch_recommend.py data/movie_embeddings.parquet --seeds 500
+    python benchmarks/batch_recommend.py --synthetic 100000 --seeds 500 --tile-mb 16 64 256
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scoring import batch_top_k, build_embedding_matrix, hybrid_scores, normalize_rows, top_k_indices
+
+
+def load_matrix(args):
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        return normalize_rows(rng.standard_normal((args.synthetic, args.dim), dtype=np.float32))
+    return build_embedding_matrix(pd.read_parquet(args.parquet, columns=['embedding'])['embedding'].values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("parquet", nargs="?", default="data/movie_embeddings.parquet")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N random vectors instead of a parquet file")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--seeds", type=int, default=500)
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--tile-mb", type=int, nargs="+", default=[16, 64, 256])
+    args = parser.parse_args()
+
+    matrix = load_matrix(args)
+    pop_norm = np.random.default_rng(1).random(len(matrix), dtype=np.float32)
+    seeds = np.random.default_rng(2).choice(len(matrix), min(args.seeds, len(matrix)), replace=False)
+    print(f"Catalog: {matrix.shape[0]} x {matrix.shape[1]}, {len(seeds)} seeds, top {args.top_n}\n")
+
+    start = time.perf_counter()
+    expected = [top_k_indices(hybrid_scores(matrix[seed], matrix, pop_norm), args.top_n, exclude=[seed]) for seed in seeds]
+    per_seed = time.perf_counter() - start
+    print(f"{'per-seed':>16} {per_seed:7.2f}s  {len(seeds) / per_seed:8.0f} seeds/s")
+
+    for tile_mb in args.tile_mb:
+        start = time.perf_counter()
+        results = batch_top_k(matrix[seeds], matrix, pop_norm, args.top_n, [[seed] for seed in seeds], tile_bytes=tile_mb * 2**20)
+        elapsed = time.perf_counter() - start
+        same = np.mean([np.array_equal(a, b) for a, b in zip(results, expected)])
+        print(f"{f'batch {tile_mb}MB':>16} {elapsed:7.2f}s  {len(seeds) / elapsed:8.0f} seeds/s  "
+              f"{per_seed / elapsed:5.1f}x  identical={same:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Per-request latency of the music recommendation path at music-catalog scale.
+
+Compares, for "tracks similar to this one" with hybrid scoring:
+    per-request  np.stack of the per-row embedding lists + full argsort (how movies/books used to work)
+    exact        preloaded normalized matrix + argpartition top-k (scoring.py)
+    ann          IVF candidates only (what /recommend/music uses by default, MUSIC_SEARCH_MODE=ann)
+
+Usage (from the repo root):
+    python benchmarks/music_latency.py data/music_embeddings.parquet
+    python benchmarks/music_latency.py --synthetic 120000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ann_index import IVFIndex
+from scoring import build_embedding_matrix, hybrid_scores, normalize_rows, top_k_indices
+
+
+def load_catalog(args):
+    """Returns (per-row embedding lists, normalized matrix, pop_norm)."""
+    rng = np.random.default_rng(0)
+    if args.synthetic:
+        centers = rng.normal(size=(512, args.dim)).astype(np.float32)
+        matrix = centers[rng.integers(0, 512, args.synthetic)] + 0.5 * rng.normal(size=(args.synthetic, args.dim)).astype(np.float32)
+        rows = list(matrix.astype(np.float64)) if args.baseline_queries else None
+        matrix = normalize_rows(matrix)
+    else:
+        rows = pd.read_parquet(args.parquet, columns=['embedding'])['embedding'].values
+        matrix = build_embedding_matrix(rows)
+    popularity = rng.integers(0, 100, len(matrix))
+    pop_norm = (np.log1p(popularity) / np.log1p(popularity.max())).astype(np.float32)
+    return rows, matrix, pop_norm
+
+
+def percentiles(samples_ms):
+    return " ".join(f"p{p}={np.percentile(samples_ms, p):.2f}ms" for p in (50, 95, 99))
+
+
+def timed(run, seeds):
+    samples = []
+    for seed in seeds:
+        start = time.perf_counter()
+        run(seed)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("parquet", nargs="?", default="data/music_embeddings.parquet")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N random clustered tracks instead of a parquet file")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--baseline-queries", type=int, default=10, help="The per-request path is slow; sample fewer")
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, default=8)
+    args = parser.parse_args()
+
+    rows, matrix, pop_norm = load_catalog(args)
+    print(f"Catalog: {matrix.shape[0]} tracks x {matrix.shape[1]} dims")
+    start = time.perf_counter()
+    index = IVFIndex.build(matrix, nprobe=args.nprobe)
+    print(f"Built IVF index with {index.n_lists} lists in {time.perf_counter() - start:.2f}s\n")
+
+    seeds = np.random.default_rng(1).choice(len(matrix), args.queries, replace=False)
+
+    def per_request(seed):
+        all_embeddings = np.stack(rows)
+        norms = np.linalg.norm(all_embeddings, axis=1)
+        query = all_embeddings[seed]
+        similarities = all_embeddings @ query / (norms * np.linalg.norm(query))
+        scores = 0.8 * similarities + 0.2 * pop_norm
+        return np.argsort(scores)[::-1][1:args.top_n + 1]
+
+    def exact(seed):
+        return top_k_indices(hybrid_scores(matrix[seed], matrix, pop_norm), args.top_n, exclude=[seed])
+
+    def ann(seed):
+        candidates = index.candidates(matrix[seed])
+        scores = hybrid_scores(matrix[seed], matrix[candidates], pop_norm[candidates])
+        return candidates[top_k_indices(scores, args.top_n, exclude=np.flatnonzero(candidates == seed))]
+
+    if rows is not None and args.baseline_queries:
+        print(f"{'per-request':>12} {percentiles(timed(per_request, seeds[:args.baseline_queries]))}")
+    exact_ms = timed(exact, seeds)
+    print(f"{'exact':>12} {percentiles(exact_ms)}")
+    ann_ms = timed(ann, seeds)
+    truth = [set(exact(seed)) for seed in seeds]
+    recall = np.mean([len(truth[i] & set(ann(seed))) / args.top_n for i, seed in enumerate(seeds)])
+    print(f"{'ann':>12} {percentiles(ann_ms)}  recall@{args.top_n}={recall:.3f} (nprobe={args.nprobe})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Local stand-in for the TMDb and Google Books endpoints the API calls for images.
+
+Serves /3/movie/{tmdb_id} and /books/v1/volumes?q=isbn:{isbn} with canned JSON after a
+configurable delay, and can fail or hang a fraction of requests, so image fan-out,
+timeouts and deadlines can be exercised without network access or API keys.
+
+    python benchmarks/stub_image_server.py --port 8765 --delay 0.2 --fail-rate 0.1
+    TMDB_API_BASE=http://127.0.0.1:8765 GOOGLE_BOOKS_API_BASE=http://127.0.0.1:8765 python api.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    delay = 0.0
+    fail_rate = 0.0
+    hang_rate = 0.0
+    hang_seconds = 30.0
+    requests_served = 0
+
+    def do_GET(self):
+        type(self).requests_served += 1
+        roll = random.random()
+        if roll < self.hang_rate:
+            time.sleep(self.hang_seconds)
+        time.sleep(self.delay)
+        if roll > 1 - self.fail_rate:
+            return self._send(503, {"status_message": "stub failure"})
+
+        url = urlparse(self.path)
+        movie = re.fullmatch(r"/3/movie/(\d+)", url.path)
+        if movie:
+            return self._send(200, {"id": int(movie.group(1)), "poster_path": f"/stub{movie.group(1)}.jpg"})
+        if url.path == "/books/v1/volumes":
+            isbn = parse_qs(url.query).get("q", [""])[0].removeprefix("isbn:")
+            return self._send(200, {"items": [{"volumeInfo": {"imageLinks": {"thumbnail": f"http://stub/covers/{isbn}.jpg"}}}]})
+        self._send(404, {"status_message": "not found"})
+
+    def _send(self, status: int, body: dict):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server(port: int = 0, delay: float = 0.0, fail_rate: float = 0.0, hang_rate: float = 0.0):
+    """Starts the stub server on a background thread and returns it (server.server_port is the bound port)."""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"delay": delay, "fail_rate": fail_rate, "hang_rate": hang_rate})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.2, help="Seconds before each response")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraction of requests that hang for 30s")
+    args = parser.parse_args()
+    server = start_stub_server(args.port, args.delay, args.fail_rate, args.hang_rate)
+    print(f"Stub image server listening on http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
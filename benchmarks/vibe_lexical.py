@@ -0,0 +1,64 @@
+"""Local /vibe keyword path: the old whole-string str.contains fallback vs. the BM25 lexical index.
+
+Reports per-query latency and how many vibes match anything at all; a miss used to mean
+copying and sorting the whole catalog by popularity.
+
+Usage (from the repo root):
+    python benchmarks/vibe_lexical.py data/movies.csv --repeat 20
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lexical_index import BM25Index
+
+VIBES = ["dark comedy", "comedy", "sci-fi adventures in space", "animated films for children", "toy story",
+         "a movie about war and romance", "film-noir crime", "feel good musical", "horror in the woods",
+         "heist thriller", "romantic comedies", "space", "western gunfight", "documentary about music"]
+
+
+def str_contains(df, vibe_text, top_n):
+    mask = (df['title'].str.contains(vibe_text, case=False, na=False, regex=False) |
+            df['genres'].str.contains(vibe_text, case=False, na=False, regex=False))
+    fallback_df = df[mask].copy()
+    matched = not fallback_df.empty
+    if not matched:
+        fallback_df = df.copy()
+    return fallback_df.sort_values('pop_norm', ascending=False).head(top_n), matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("movies", nargs="?", default="data/movies.csv")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--top-n", type=int, default=5)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.movies)
+    df['pop_norm'] = np.random.default_rng(0).random(len(df), dtype=np.float32)
+    pop_norm = df['pop_norm'].to_numpy()
+    started = time.perf_counter()
+    index = BM25Index([df['title'], df['genres'].replace('(no genres listed)', '')])
+    print(f"Catalog: {len(df)} movies; BM25 index built in {(time.perf_counter() - started) * 1000:.0f}ms "
+          f"({len(index.vocabulary)} terms, {len(index.rows)} postings)\n")
+
+    for name, search in (("str.contains", lambda vibe: str_contains(df, vibe, args.top_n)[1]),
+                         ("bm25", lambda vibe: len(index.search(vibe, pop_norm, args.top_n)[0]) > 0)):
+        samples, matched = [], 0
+        for vibe in VIBES:
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                hit = search(vibe)
+                samples.append((time.perf_counter() - start) * 1000)
+            matched += hit
+        print(f"{name:>13} p50={np.percentile(samples, 50):.2f}ms p95={np.percentile(samples, 95):.2f}ms  "
+              f"matched {matched}/{len(VIBES)} vibes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU cache with optional per-entry TTLs.
+
+    `negative_ttl` is the lifetime used by `put_negative`, for remembering failed lookups
+    (e.g. "No Poster Found") long enough to stop re-hitting an upstream, but not forever.
+    With a `store`, misses read through to it and every put is written behind to it, so
+    entries survive restarts; the in-memory LRU stays the bounded hot set. `write_through`
+    commits puts before returning instead, for entries other processes must see right away.
+    """
+
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = None, negative_ttl: float = None, store=None,
+                 write_through: bool = False):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.store = store
+        self.write_through = write_through
+        self._data = OrderedDict()  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.negative_hits = self.store_hits = 0
+        self._negative_keys = set()
+
+    def get(self, key, default=None, refresh: bool = False):
+        """Returns the cached value (refreshing its LRU position), or `default` on a miss.
+
+        With `refresh`, the store is read first, for entries another process may have rewritten.
+        """
+        if refresh:
+            value = self._read_store(key)
+            if value is not _MISSING: return value
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    if key in self._negative_keys: self.negative_hits += 1
+                    return value
+                self._remove(key)
+                self.expirations += 1
+        
+        value = self._read_store(key)
+        if value is not _MISSING: return value
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            return entry is not _MISSING and (entry[1] is None or entry[1] > time.monotonic())
+
+    def put(self, key, value, ttl: float = None):
+        """Stores a value, evicting the least recently used entries beyond `maxsize`."""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._negative_keys.discard(key)
+            self._store(key, value, ttl)
+        self._write_behind(key, value, ttl)
+
+    def put_negative(self, key, value):
+        """Stores the result of a failed lookup for `negative_ttl` seconds."""
+        ttl = self.negative_ttl if self.negative_ttl is not None else self.ttl
+        with self._lock:
+            self._negative_keys.add(key)
+            self._store(key, value, ttl)
+        self._write_behind(key, value, ttl)
+
+    def warm(self, limit: int = None):
+        """Bulk-loads the most recently written, unexpired entries from the store. Returns the count."""
+        if self.store is None: return 0
+        count = 0
+        now = time.time()
+        with self._lock:
+            for key, value, expires_at in self.store.items(self.name, limit or self.maxsize):
+                if key in self._data: continue
+                self._store(key, value, expires_at - now if expires_at is not None else None)
+                # Loaded newest-first; push older entries toward the eviction end
+                self._data.move_to_end(key, last=False)
+                count += 1
+        return count
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._negative_keys.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data), "maxsize": self.maxsize,
+            "hits": self.hits, "misses": self.misses, "negative_hits": self.negative_hits, "store_hits": self.store_hits,
+            "evictions": self.evictions, "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    # Callers hold self._lock
+    def _store(self, key, value, ttl):
+        self._data[key] = (value, time.monotonic() + ttl if ttl is not None else None)
+        self._data.move_to_end(key)
+        while self.maxsize is not None and len(self._data) > self.maxsize:
+            evicted, _ = self._data.popitem(last=False)
+            self._negative_keys.discard(evicted)
+            self.evictions += 1
+
+    def _remove(self, key):
+        del self._data[key]
+        self._negative_keys.discard(key)
+
+    def _write_behind(self, key, value, ttl):
+        if self.store is not None:
+            self.store.put(self.name, key, value, time.time() + ttl if ttl is not None else None, sync=self.write_through)
+
+    def _read_store(self, key):
+        """Loads an unexpired entry from the store into memory and returns it, or _MISSING."""
+        stored = self.store.get(self.name, key) if self.store is not None else None
+        if stored is None: return _MISSING
+        value, expires_at = stored
+        with self._lock:
+            self._store(key, value, expires_at - time.time() if expires_at is not None else None)
+            self.hits += 1
+            self.store_hits += 1
+        return value
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key: the first caller runs the function, the others
+    wait for its result (or its exception) instead of repeating the upstream call."""
+
+    def __init__(self):
+        self._calls = {}  # key -> Future of the in-flight call
+        self._lock = threading.Lock()
+        self.calls = self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self):
+        return {"calls": self.calls, "coalesced": self.coalesced}
+
+
+class PersistentStore:
+    """SQLite-backed key-value store that cache namespaces read through and write behind to.
+
+    Keys and values are JSON-encoded, so int ids (tmdbId) and str ids (ISBN) round-trip.
+    Writes are queued and committed in batches by a background thread, so request threads
+    never wait on disk; `flush()` blocks until everything queued so far is committed.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0, batch_size: int = 500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._local = threading.local()
+        self._queue = queue.Queue()
+        directory = os.path.dirname(path)
+        if directory: os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,
+                expires_at REAL, updated_at REAL NOT NULL, PRIMARY KEY (namespace, key))""")
+        self._writer = threading.Thread(target=self._write_loop, name="cache-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")  # Readers don't block the writer thread
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key):
+        """Returns (value, expires_at) for an unexpired entry, or None."""
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?", (namespace, json.dumps(key))
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return json.loads(row[0]), row[1]
+
+    def put(self, namespace: str, key, value, expires_at: float = None, sync: bool = False):
+        """Queues a write for the background writer, or with `sync` commits it before returning."""
+        row = (namespace, json.dumps(key), json.dumps(value), expires_at, time.time())
+        if not sync:
+            self._queue.put(row)
+            return
+        try:
+            with self._connection() as conn:
+                conn.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)", row)
+        except sqlite3.Error as e:
+            print(f"Cache write failed for {namespace} entry: {e}")
+
+    def items(self, namespace: str, limit: int = None):
+        """Yields (key, value, expires_at) for unexpired entries, most recently written first."""
+        rows = self._connection().execute(
+            "SELECT key, value, expires_at FROM cache WHERE namespace = ? AND (expires_at IS NULL OR expires_at > ?) "
+            "ORDER BY updated_at DESC LIMIT ?", (namespace, time.time(), -1 if limit is None else limit))
+        for key, value, expires_at in rows:
+            yield json.loads(key), json.loads(value), expires_at
+
+    def purge_expired(self):
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)).rowcount
+
+    def flush(self):
+        """Blocks until every write queued so far has been committed."""
+        self._queue.join()
+
+    def _write_loop(self):
+        conn = self._connection()
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)", batch)
+            except sqlite3.Error as e:
+                print(f"Cache write-behind failed for {len(batch)} entries: {e}")
+            finally:
+                for _ in batch: self._queue.task_done()
+
+
+class CacheRegistry:
+    """Named, independently bounded cache namespaces, so one kind of entry can't crowd out another."""
+
+    def __init__(self, store: PersistentStore = None):
+        self.store = store
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    def namespace(self, name: str, maxsize: int = 1024, ttl: float = None, negative_ttl: float = None, persistent: bool = False,
+                  write_through: bool = False):
+        """Returns the namespace called `name`, creating it with the given limits on first use.
+
+        `persistent` namespaces read through / write behind to the registry's store, if it has one;
+        `write_through` ones commit each put to it before returning.
+        """
+        with self._lock:
+            if name not in self._namespaces:
+                store = self.store if persistent else None
+                self._namespaces[name] = LRUCache(name, maxsize, ttl, negative_ttl, store, write_through)
+            return self._namespaces[name]
+
+    def warm(self):
+        """Bulk-loads every persistent namespace from the store. Returns {name: entries loaded}."""
+        return {name: cache.warm() for name, cache in self._namespaces.items() if cache.store is not None}
+
+    def stats(self):
+        return {name: cache.stats() for name, cache in self._namespaces.items()}
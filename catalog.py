@@ -0,0 +1,244 @@
+"""Offline-built catalog artifacts, so the API boots without parsing CSVs or aggregating ratings.
+
+Build (or rebuild) from the repo root after changing anything in data/:
+    python catalog.py                   # movies, books and (if embedded) music
+    python catalog.py --only movies
+Each catalog is written to data/catalog/<name>/:
+    embeddings.npy    L2-normalized float32 matrix (see embedding_store.py), memory-mapped by the API
+    pop_norm.npy      float32 log-scaled popularity, also memory-mapped
+    metadata.arrow    final display columns plus the precomputed search_title, as an uncompressed
+                      columnar Arrow (Feather) file; vectors are never stored per row. It is read into
+                      a pandas frame at boot, so each worker process holds its own copy
+    manifest.json     row count and the size/mtime of every source file it was built from
+Tables derived from a build are stored next to it and record its build_fingerprint: the API's IVF
+index (ann.ivf.npz, in "ann" search mode) and the neighbour tables (neighbors.py).
+"""
+import argparse
+import glob
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from pyarrow import feather
+
+from embedding_store import EmbeddingStore
+from ratings_stats import RATINGS_PATTERN, update_ratings_stats
+from scoring import build_embedding_matrix
+from title_index import process_title_for_search
+
+CATALOG_VERSION = 2  # Bump when the artifact layout or the prepare_* logic changes
+
+MOVIE_SOURCES = ["data/movie_embeddings.parquet", "data/movies.csv", "data/links.csv", RATINGS_PATTERN,
+                 "data/custom_embeddings.parquet"]
+BOOK_SOURCES = ["data/book_embeddings.parquet"]
+MUSIC_SOURCES = ["data/music_embeddings.parquet", "data/spotify_tracks.csv"]
+
+
+def prepare_movies(catalog_dir: str = "data/catalog"):
+    """Loads all movie data files, including custom additions, and merges them."""
+    embeddings_df = pd.read_parquet("data/movie_embeddings.parquet")
+    movies_genres_df = pd.read_csv("data/movies.csv")[['movieId', 'genres']]
+    links_df = pd.read_csv("data/links.csv")[['movieId', 'tmdbId']]
+
+    # Average rating and popularity (number of ratings), streamed from the ratings files and persisted
+    ratings = update_ratings_stats(os.path.join(catalog_dir, "ratings_stats.npz"))
+
+    merged_df = pd.merge(embeddings_df, movies_genres_df, on='movieId', how='inner')
+    final_df = pd.merge(merged_df, links_df, on='movieId', how='inner')
+
+    # Add avg_rating and popularity
+    avg_ratings, ratings_count = ratings.lookup(final_df['movieId'].to_numpy())
+    final_df['avg_rating'] = np.where(ratings_count > 0, avg_ratings, 3.5)  # Default to neutral
+    final_df['popularity'] = np.where(ratings_count > 0, ratings_count, 1).astype(float)  # At least 1 to avoid div0
+
+    try:
+        custom_embeddings_df = pd.read_parquet("data/custom_embeddings.parquet")
+        # For custom, assume default popularity and rating if not present
+        custom_embeddings_df['avg_rating'] = custom_embeddings_df.get('avg_rating', 3.5)
+        custom_embeddings_df['popularity'] = custom_embeddings_df.get('popularity', 100)
+        final_df = pd.concat([final_df, custom_embeddings_df], ignore_index=True)
+        print(f"Successfully loaded and combined {len(custom_embeddings_df)} custom movies.")
+    except FileNotFoundError:
+        print("No custom movies file found.")
+
+    final_df.dropna(subset=['tmdbId'], inplace=True)
+    final_df['tmdbId'] = final_df['tmdbId'].astype(int)
+    final_df['search_title'] = final_df['title'].apply(process_title_for_search)
+
+    # Normalize popularity for hybrid (log scale for better distribution)
+    final_df['pop_norm'] = np.log1p(final_df['popularity']) / np.log1p(final_df['popularity'].max())
+    # Positional row numbers double as labels so matrix rows line up with df.index
+    final_df.reset_index(drop=True, inplace=True)
+    return final_df
+
+
+def prepare_books(catalog_dir: str = "data/catalog"):
+    """Loads and prepares the book data."""
+    df = pd.read_parquet("data/book_embeddings.parquet")
+    df.dropna(subset=['isbn', 'title', 'authors'], inplace=True)
+    df['search_title'] = df['title'].apply(process_title_for_search)
+
+    # Assume book data has 'average_rating' and 'ratings_count'; if not, fill defaults
+    if 'average_rating' not in df.columns:
+        df['average_rating'] = 4.0  # Default
+    if 'ratings_count' not in df.columns:
+        df['ratings_count'] = 1000  # Default popularity
+
+    # Use ratings_count as popularity
+    df['popularity'] = df['ratings_count']
+    df['avg_rating'] = df['average_rating']  # Expose as avg_rating for consistency
+    # Normalize popularity (log scale)
+    df['pop_norm'] = np.log1p(df['popularity']) / np.log1p(df['popularity'].max())
+    df.reset_index(drop=True, inplace=True)
+    return df
+
+
+def prepare_music(catalog_dir: str = "data/catalog"):
+    """Loads the track embeddings and joins album, genre and popularity from the Spotify tracks file."""
+    df = pd.read_parquet("data/music_embeddings.parquet")
+    df = df.dropna(subset=['track_name', 'artists']).drop_duplicates(subset=['track_id'])
+    try:
+        # The same track is listed once per genre; keep its first listing
+        tracks_df = pd.read_csv("data/spotify_tracks.csv", on_bad_lines='skip',
+                                usecols=['track_id', 'album_name', 'track_genre', 'popularity'])
+        df = pd.merge(df, tracks_df.drop_duplicates(subset=['track_id']), on='track_id', how='left')
+    except FileNotFoundError:
+        print("No Spotify tracks file found; music has no album, genre or popularity.")
+    if 'popularity' not in df.columns:
+        df['popularity'] = 50  # Default: middle of Spotify's 0-100 scale
+    df['popularity'] = df['popularity'].fillna(0)
+
+    df['title'] = df['track_name']  # Shared name for the display title across domains
+    df['search_title'] = df['track_name'].apply(process_title_for_search)
+    df['search_artist'] = df['artists'].apply(process_title_for_search)
+    # Normalize popularity (log scale)
+    df['pop_norm'] = np.log1p(df['popularity']) / np.log1p(max(df['popularity'].max(), 1))
+    # Most popular first, so "the first row with this name" is the best-known track of that name
+    df = df.sort_values('popularity', ascending=False, kind='stable')
+    df.reset_index(drop=True, inplace=True)
+    return df
+
+
+CATALOGS = {"movies": (prepare_movies, MOVIE_SOURCES), "books": (prepare_books, BOOK_SOURCES),
+            "music": (prepare_music, MUSIC_SOURCES)}
+
+
+def source_state(paths):
+    """Returns {path: [size, mtime_ns]} for each source file, or None for files that don't exist.
+
+    Glob patterns (e.g. data/ratings*.csv) expand to every matching file.
+    """
+    state = {}
+    for pattern in paths:
+        for path in (sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]):
+            state[path] = _file_state(path)
+    return state
+
+
+def _file_state(path: str):
+    try:
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+    except FileNotFoundError:
+        return None
+
+
+def _write_atomic(path: str, write, mode: str = "wb"):
+    """Writes via a temp file and renames it into place, so readers never see a partial file."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"  # Per process: several workers may rebuild a stale catalog at once
+    with open(tmp_path, mode) as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def build_catalog(name: str, catalog_dir: str = "data/catalog"):
+    """Runs the full CSV/parquet preparation for a catalog and writes its artifact. Returns the row count."""
+    prepare, sources = CATALOGS[name]
+    started = time.perf_counter()
+    state = source_state(sources)  # Taken first, so edits made during the build leave it stale
+    df = prepare(catalog_dir)
+    matrix = build_embedding_matrix(df['embedding'].values)
+    pop_norm = df['pop_norm'].to_numpy(dtype=np.float32)
+
+    out_dir = os.path.join(catalog_dir, name)
+    os.makedirs(out_dir, exist_ok=True)
+    # The manifest is written last: until it matches the sources, the artifact counts as stale
+    manifest_path = os.path.join(out_dir, "manifest.json")
+    if os.path.exists(manifest_path): os.remove(manifest_path)
+    EmbeddingStore.write(os.path.join(out_dir, "embeddings.npy"), matrix)
+    _write_atomic(os.path.join(out_dir, "pop_norm.npy"), lambda f: np.save(f, pop_norm))
+    _write_atomic(os.path.join(out_dir, "metadata.arrow"),
+                  lambda f: df.drop(columns=['embedding']).to_feather(f, compression="uncompressed"))
+    manifest = {"version": CATALOG_VERSION, "rows": len(df), "dim": int(matrix.shape[1]),
+                "built_at": time.time(), "sources": state}
+    _write_atomic(manifest_path, lambda f: json.dump(manifest, f, indent=2), mode="w")
+    print(f"Built {name} catalog: {len(df)} rows in {time.perf_counter() - started:.1f}s -> {out_dir}")
+    return len(df)
+
+
+def stale_reason(name: str, catalog_dir: str = "data/catalog"):
+    """Returns why the artifact for a catalog can't be used (missing, old format, sources changed), or None."""
+    _, sources = CATALOGS[name]
+    try:
+        with open(os.path.join(catalog_dir, name, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return "no catalog artifact"
+    if manifest.get("version") != CATALOG_VERSION:
+        return f"artifact format v{manifest.get('version')} != v{CATALOG_VERSION}"
+    built_from, current = manifest.get("sources", {}), source_state(sources)
+    for path in sorted(set(built_from) | set(current)):
+        if built_from.get(path) != current.get(path):
+            return f"{path} changed since the catalog was built"
+    return None
+
+
+def build_fingerprint(name: str, catalog_dir: str = "data/catalog"):
+    """Identifies one build of a catalog artifact; tables derived from its vectors record it to detect rebuilds."""
+    with open(os.path.join(catalog_dir, name, "manifest.json")) as f:
+        manifest = json.load(f)
+    return {"catalog_built_at": manifest["built_at"], "rows": manifest["rows"]}
+
+
+def load_catalog(name: str, catalog_dir: str = "data/catalog", auto_build: bool = True):
+    """Loads a catalog artifact as (metadata frame, EmbeddingStore, memory-mapped pop_norm).
+
+    The vectors and pop_norm stay mapped (shared by every process that loads them); the metadata
+    frame is converted from Arrow into this process's own memory.
+
+    A missing or stale artifact is rebuilt from the source files when `auto_build` is set
+    (the slow path the artifact exists to avoid), otherwise it is an error.
+    """
+    reason = stale_reason(name, catalog_dir)
+    if reason is not None:
+        if not auto_build:
+            raise RuntimeError(f"{name} catalog is unusable ({reason}); run `python catalog.py --only {name}`.")
+        print(f"Rebuilding {name} catalog: {reason}.")
+        build_catalog(name, catalog_dir)
+
+    out_dir = os.path.join(catalog_dir, name)
+    # Mapping saves a read buffer, but to_pandas() still copies the columns into this process
+    df = feather.read_table(os.path.join(out_dir, "metadata.arrow"), memory_map=True).to_pandas()
+    store = EmbeddingStore(os.path.join(out_dir, "embeddings.npy"))
+    pop_norm = np.load(os.path.join(out_dir, "pop_norm.npy"), mmap_mode="r")
+    if len(store) != len(df):
+        raise RuntimeError(f"{name} catalog is corrupt: {len(store)} embeddings for {len(df)} rows.")
+    return df, store, pop_norm
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", choices=sorted(CATALOGS), default=None)
+    parser.add_argument("--catalog-dir", default="data/catalog")
+    args = parser.parse_args()
+    for name in ([args.only] if args.only else CATALOGS):
+        if name == "music" and not args.only and not os.path.exists(MUSIC_SOURCES[0]):
+            print("Skipping music: no music embeddings generated yet.")
+            continue
+        build_catalog(name, args.catalog_dir)
+
+
+if __name__ == "__main__":
+    main()
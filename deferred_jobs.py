@@ -0,0 +1,76 @@
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, wait
+
+from cache import LRUCache
+
+
+class DeferredJobs:
+    """Runs slow, cacheable computations (LLM explanations) on a background pool behind ticket ids.
+
+    A ticket is derived from the result's cache key, so identical requests share one job and one
+    ticket. Finished results land in `cache` like a synchronous call would put them there; a cached
+    result is returned straight away without touching the pool. `tickets` maps ticket ids to their
+    cache key (and error, once failed) for its TTL, so clients can poll or stream a result after the
+    response. With `cache` and `tickets` in a shared persistent store, any worker process resolves a
+    ticket another one issued; the issuing process also waits on the job's future directly.
+    """
+
+    def __init__(self, name: str, cache: LRUCache, tickets: LRUCache, workers: int = 4, poll_interval: float = 0.25):
+        self.cache = cache
+        self.tickets = tickets
+        self.poll_interval = poll_interval  # Seconds between store reads while waiting on another process's job
+        self._futures = LRUCache(f"{name}_futures", tickets.maxsize, tickets.ttl)  # This process's jobs
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+
+    @staticmethod
+    def ticket_id(key: str):
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+
+    def request(self, key: str, compute, wait_for: float = 0.0):
+        """Returns (result, None) if it is cached or `compute()` finishes within `wait_for` seconds,
+        otherwise (None, ticket id) while it keeps running in the background. An exception raised by
+        `compute()` is reported as a "failed" ticket, never as a result."""
+        cached = self.cache.get(key)
+        if cached is not None: return cached, None
+        ticket = self.ticket_id(key)
+        future = self._futures.get(ticket)
+        # A finished job whose result isn't cached failed (or was evicted); run it again, as a synchronous call would
+        if future is None or future.done():
+            self.tickets.put(ticket, {"key": key})
+            future = self._pool.submit(self._run, ticket, key, compute)
+            self._futures.put(ticket, future)
+        try:
+            return future.result(timeout=wait_for), None
+        except TimeoutError:
+            return None, ticket
+        except Exception:
+            return None, ticket  # Failed within wait_for; the ticket reports it
+
+    def status(self, ticket: str, timeout: float = 0.0):
+        """Returns ("pending" | "done" | "failed" | "unknown", result or error message) for a ticket,
+        waiting up to `timeout` seconds for a pending job."""
+        future = self._futures.get(ticket)
+        if future is not None:
+            wait([future], timeout=timeout)
+            if not future.done(): return "pending", None
+            if future.exception() is not None: return "failed", str(future.exception())
+            return "done", future.result()
+
+        # Issued by another worker process: follow the ticket to its result in the shared stores
+        deadline = time.monotonic() + timeout
+        while True:
+            entry = self.tickets.get(ticket, refresh=True)
+            if entry is None: return "unknown", None
+            result = self.cache.get(entry["key"])
+            if result is not None: return "done", result
+            if "error" in entry: return "failed", entry["error"]
+            if time.monotonic() >= deadline: return "pending", None
+            time.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+
+    def _run(self, ticket: str, key: str, compute):
+        try:
+            return compute()
+        except Exception as e:
+            self.tickets.put(ticket, {"key": key, "error": str(e)})
+            raise
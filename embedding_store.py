@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+
+
+class EmbeddingStore:
+    """Read-only float32 embedding matrix kept in a raw .npy file and memory-mapped on open.
+
+    Every process that opens the same file maps the same page-cache pages, so any number of
+    uvicorn/gunicorn workers share one physical copy of the vectors and a new worker starts
+    without reading them: pages are faulted in on first use. The mapping is read-only, so a
+    stray in-place write raises instead of silently giving one worker a private copy.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.matrix = np.load(path, mmap_mode="r")
+        if self.matrix.dtype != np.float32 or self.matrix.ndim != 2:
+            raise ValueError(f"{path} is not a 2-D float32 embedding matrix")
+
+    def __len__(self):
+        return len(self.matrix)
+
+    @property
+    def dim(self):
+        return self.matrix.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.matrix.nbytes
+
+    def rows(self, indices):
+        """Returns the vectors for the given row indices as a regular (private, writable) array."""
+        return np.array(self.matrix[np.asarray(indices, dtype=np.intp)], dtype=np.float32)
+
+    @staticmethod
+    def write(path: str, matrix: np.ndarray):
+        """Saves a matrix as float32 .npy via a per-process temp file, so concurrent writers and
+        readers never see a partial file."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.ascontiguousarray(matrix, dtype=np.float32))
+        os.replace(tmp_path, path)
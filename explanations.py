@@ -0,0 +1,104 @@
+"""LLM recommendation explanations: prompts, cache keys and batch warming.
+
+Independent of the loaded catalogs, so the API (one explanation per request) and the offline
+warm-up job (many per call, see warm_explanations.py) build the same prompts and cache keys.
+"""
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from tqdm import tqdm
+
+
+def explanation_key(original_item: str, recommended_item: str, item_type: str = 'movie'):
+    return f"exp_{item_type}_{original_item}_{recommended_item}"
+
+
+def explanation_nouns(item_type: str):
+    """(item noun, expert noun) used in explanation prompts."""
+    return {'book': ('book', 'book'), 'music': ('song', 'music')}.get(item_type, ('movie', 'movie'))
+
+
+def explanation_label(row, item_type: str):
+    """How a catalog row is named in explanation prompts (and so in their cache keys)."""
+    return f"{row['title']} by {row['artists']}" if item_type == 'music' else row['title']
+
+
+def generate_explanation(model, cache, original_item: str, recommended_item: str, item_type: str = 'movie', multiple: bool = False):
+    """Generates (and caches) a brief explanation for a recommendation, for any item type; LLM errors propagate."""
+    cache_key = explanation_key(original_item, recommended_item, item_type)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    # Create a different prompt based on the item type
+    the_type, expert = explanation_nouns(item_type)
+    liked = f"{the_type}s like" if multiple else f"the {the_type}"
+    
+    prompt = f"You are a friendly {expert} expert. In a detailed paragraph of 30-35 words, explain why someone who liked {liked} '{original_item}' would also enjoy the {the_type} '{recommended_item}'."
+    explanation = model.generate_content(prompt).text
+    cache.put(cache_key, explanation)
+    return explanation
+
+
+class FakeChatModel:
+    """Local stand-in for the Gemini chat model: answers every numbered pair of a batch prompt."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, prompt: str):
+        self.calls += 1
+        pairs = re.findall(r"^(\d+)\. '(.*)' -> '(.*)'$", prompt, flags=re.MULTILINE)
+        answers = {number: f"If you liked {original}, {recommended} shares its tone and themes." for number, original, recommended in pairs}
+
+        class Response:
+            text = f"```json\n{json.dumps(answers)}\n```"
+        return Response()
+
+
+def batch_prompt(pairs, item_type: str):
+    """One prompt for many (original, recommended) pairs, answered as a JSON object keyed by pair number."""
+    the_type, expert = explanation_nouns(item_type)
+    lines = [f"{number}. '{original}' -> '{recommended}'" for number, (original, recommended) in enumerate(pairs, 1)]
+    return (f"You are a friendly {expert} expert. For each numbered pair below, write a detailed paragraph of 30-35 words "
+            f"explaining why someone who liked the first {the_type} would also enjoy the second {the_type}.\n"
+            "Answer with only a JSON object mapping each pair number (as a string) to its paragraph.\n\n" + "\n".join(lines))
+
+
+def parse_answers(text: str, count: int):
+    """{pair index: explanation} for the well-formed answers in a batch response; anything else is dropped."""
+    match = re.search(r"\{.*\}", text, flags=re.DOTALL)  # Tolerates ```json fences and chatter around the object
+    try:
+        answers = json.loads(match.group(0)) if match else {}
+    except ValueError:
+        return {}
+    if not isinstance(answers, dict): return {}
+    parsed = {}
+    for number, explanation in answers.items():
+        if str(number).isdigit() and 1 <= int(number) <= count and isinstance(explanation, str) and explanation.strip():
+            parsed[int(number) - 1] = explanation.strip()
+    return parsed
+
+
+def warm(name: str, pairs, item_type: str, model, cache, pairs_per_call: int, workers: int):
+    """Explains every pair not yet in `cache`, `pairs_per_call` per LLM call. Returns (pairs explained, calls made)."""
+    missing = list(dict.fromkeys(pair for pair in pairs if cache.get(explanation_key(*pair, item_type)) is None))
+    print(f"{name}: {len(pairs) - len(missing)} pairs already explained, generating {len(missing)}...")
+    batches = [missing[start:start + pairs_per_call] for start in range(0, len(missing), pairs_per_call)]
+
+    def explain(batch):
+        try:
+            answers = parse_answers(model.generate_content(batch_prompt(batch, item_type)).text, len(batch))
+        except Exception as e:
+            print(f"Batch of {len(batch)} {name} pairs failed: {e}")
+            return 0
+        for position, explanation in answers.items():
+            cache.put(explanation_key(*batch[position], item_type), explanation)
+        return len(answers)
+
+    explained = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for count in tqdm(pool.map(explain, batches), total=len(batches), desc=f"Explaining {name}"):
+            explained += count
+    return explained, len(batches)
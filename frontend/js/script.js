@@ -86,15 +86,15 @@ document.addEventListener('DOMContentLoaded', () => {
             const poster = document.createElement('img');
             poster.src = item.posterUrl || item.coverUrl || 'https://via.placeholder.com/500x750.png?text=No+Image';
             poster.className = 'card-img-top';
-            poster.alt = item.title || item.track_name;
+            poster.alt = item.title;
             const cardBody = document.createElement('div');
             cardBody.className = 'card-body';
             const title = document.createElement('h6');
             title.className = 'card-title';
-            title.textContent = item.title || item.track_name;
+            title.textContent = item.title;
             const genres = document.createElement('p');
             genres.className = 'card-text small text-muted';
-            genres.textContent = item.genres || item.authors || item.artist_name || '';
+            genres.textContent = item.genres || item.authors || item.artists || '';
             cardBody.appendChild(title);
             cardBody.appendChild(genres);
             card.appendChild(poster);
@@ -247,7 +247,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // --- DUMMY DATA ---
     const dummyBookRecommendations = [{ title: "The Hunger Games", authors: "Suzanne Collins", coverUrl: "https://via.placeholder.com/500x750.png?text=Hunger+Games" }];
-    const dummyMusicRecommendations = [{ track_name: "Bohemian Rhapsody", artist_name: "Queen", coverUrl: "https://via.placeholder.com/500x500.png?text=Queen" }];
+    const dummyMusicRecommendations = [{ title: "Bohemian Rhapsody", artists: "Queen", coverUrl: "https://via.placeholder.com/500x500.png?text=Queen" }];
 
     // --- MUSIC LOGIC (using dummy data for now) ---
     musicRecommendBtn.addEventListener('click', () => {
@@ -0,0 +1,81 @@
+import re
+import unicodedata
+from collections import Counter
+
+import numpy as np
+
+from scoring import ALPHA, BETA, top_k_indices
+
+_EMPTY = np.empty(0, dtype=np.int32)
+_TOKEN = re.compile(r"[a-z0-9]+")
+# Words that say nothing about which item is meant ("a movie about ...", "something like ...")
+STOPWORDS = frozenset("a an and about are as at be by film films for from i in into is it like me movie movies my "
+                      "of on or some something that the this to want with".split())
+
+
+def _stem(token: str):
+    """Folds plurals and -ation/-ated forms, so "comedies" matches "Comedy" and "animated" matches "Animation"."""
+    for suffix in ("ation", "ated", "ating"):
+        if len(token) > len(suffix) + 3 and token.endswith(suffix): return token[:-len(suffix)]
+    if len(token) > 4 and token.endswith("ies"): return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"): return token[:-1]
+    return token
+
+
+def tokenize(text: str):
+    """Lowercased, accent-stripped, lightly stemmed word tokens, without stopwords."""
+    if not isinstance(text, str): return []
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    return [_stem(token) for token in _TOKEN.findall(text) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Inverted index with BM25 scoring over one or more text columns of a catalog, built once at load time.
+
+    Each row is one document made of all its columns (e.g. title + genres, or title + authors);
+    separators such as MovieLens' "|" between genres are word boundaries. Postings are stored as
+    flat arrays sliced per term, with each posting's BM25 weight precomputed, so a query only reads
+    the postings of its own terms and sums them per row.
+    """
+
+    def __init__(self, columns, k1: float = 1.2, b: float = 0.75):
+        vocabulary, term_ids, rows, frequencies = {}, [], [], []
+        lengths = []
+        for row, texts in enumerate(zip(*columns)):
+            counts = Counter(token for text in texts for token in tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                rows.append(row)
+                frequencies.append(frequency)
+        self.vocabulary = vocabulary
+        self.n_rows = len(lengths)
+
+        term_ids = np.array(term_ids, dtype=np.int32)
+        order = np.argsort(term_ids, kind='stable')  # Group postings by term; rows stay ascending within a term
+        term_ids = term_ids[order]
+        self.rows = np.array(rows, dtype=np.int32)[order]
+        frequencies = np.array(frequencies, dtype=np.float32)[order]
+        doc_freq = np.bincount(term_ids, minlength=len(vocabulary))
+        self.offsets = np.concatenate([[0], np.cumsum(doc_freq)]).astype(np.int64)
+
+        lengths = np.array(lengths, dtype=np.float32)
+        idf = np.log1p((self.n_rows - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        length_norm = k1 * (1 - b + b * lengths[self.rows] / max(float(lengths.mean()) if len(lengths) else 0.0, 1.0))
+        self.weights = (idf[term_ids] * frequencies * (k1 + 1) / (frequencies + length_norm)).astype(np.float32)
+
+    def search(self, query: str, pop_norm: np.ndarray, k: int, alpha: float = ALPHA, beta: float = BETA):
+        """Returns (rows, scores) of the k best matches, best first; empty if no query term is indexed.
+
+        BM25 is scaled to [0, 1] by the best match, then blended with popularity like the
+        embedding paths: alpha * bm25 + beta * pop_norm.
+        """
+        terms = {self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary}
+        if not terms:
+            return _EMPTY, np.empty(0, dtype=np.float32)
+        spans = [slice(self.offsets[term], self.offsets[term + 1]) for term in terms]
+        candidates, positions = np.unique(np.concatenate([self.rows[span] for span in spans]), return_inverse=True)
+        bm25 = np.bincount(positions, weights=np.concatenate([self.weights[span] for span in spans]))
+        scores = (alpha * bm25 / bm25.max() + beta * np.asarray(pop_norm)[candidates]).astype(np.float32)
+        top = top_k_indices(scores, k)
+        return candidates[top], scores[top]
@@ -0,0 +1,166 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class UpstreamError(Exception):
+    """An external metadata call failed, timed out, was rate limited, or was short-circuited."""
+
+
+class TokenBucket:
+    """Client-side rate limiter: `rate` requests per second with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float = None):
+        """Takes one token, waiting up to `timeout` seconds for it. Returns False if it never came."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """Stops calling an upstream after `failure_threshold` consecutive failures.
+
+    While open, calls fail immediately instead of tying up worker threads on a slow upstream.
+    After `reset_timeout` seconds one trial call is let through (half-open); success closes it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None: return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def release(self):
+        """Gives back a half-open trial slot when the call never reached the upstream."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class UpstreamClient:
+    """A long-lived, pooled keep-alive HTTP session to one upstream, with explicit
+    connect/read timeouts, a client-side rate limit and a circuit breaker."""
+
+    def __init__(self, name: str, base_url: str, rate_per_second: float, pool_size: int = 32,
+                 connect_timeout: float = 2.0, read_timeout: float = 4.0, rate_limit_wait: float = 2.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.rate_limit_wait = rate_limit_wait
+        self.limiter = TokenBucket(rate_per_second)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.calls = self.failures = self.short_circuited = self.rate_limited = 0
+
+        # Short backoff: callers sit behind per-response deadlines, so long sleeps would only waste threads
+        retry_strategy = Retry(total=2, status_forcelist=[429, 500, 502, 503, 504], backoff_factor=0.3,
+                               allowed_methods=["GET"], respect_retry_after_header=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry_strategy)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter); self.session.mount("http://", adapter)
+
+    def get_json(self, path: str, params: dict = None):
+        """GETs base_url + path and returns the decoded JSON, or None for a 404.
+
+        Raises UpstreamError on failures, timeouts, an open circuit, or when no rate-limit token
+        frees up within `rate_limit_wait` seconds.
+        """
+        if not self.breaker.allow():
+            self.short_circuited += 1
+            raise UpstreamError(f"{self.name} circuit open")
+        if not self.limiter.acquire(timeout=self.rate_limit_wait):
+            self.rate_limited += 1
+            self.breaker.release()
+            raise UpstreamError(f"{self.name} client-side rate limit exceeded")
+        self.calls += 1
+        try:
+            response = self.session.get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+            if response.status_code == 404:
+                self.breaker.record_success()
+                return None
+            response.raise_for_status()
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.failures += 1
+            self.breaker.record_failure()
+            raise UpstreamError(f"{self.name} request failed: {e}") from e
+        self.breaker.record_success()
+        return data
+
+    def stats(self):
+        return {
+            "calls": self.calls, "failures": self.failures, "short_circuited": self.short_circuited,
+            "rate_limited": self.rate_limited, "circuit": self.breaker.state,
+        }
+
+
+class TMDbClient(UpstreamClient):
+    def __init__(self, api_key: str, base_url: str = "https://api.themoviedb.org", rate_per_second: float = 40, **kwargs):
+        super().__init__("tmdb", base_url, rate_per_second, **kwargs)
+        self.api_key = api_key
+
+    def poster_url(self, tmdb_id: int):
+        """Returns the w500 poster URL for a movie, or None if TMDb has no poster for it."""
+        data = self.get_json(f"/3/movie/{tmdb_id}", {"api_key": self.api_key, "language": "en-US"})
+        poster_path = (data or {}).get('poster_path')
+        return f"https://image.tmdb.org/t/p/w500/{poster_path}" if poster_path else None
+
+
+class GoogleBooksClient(UpstreamClient):
+    def __init__(self, api_key: str, base_url: str = "https://www.googleapis.com", rate_per_second: float = 10, **kwargs):
+        super().__init__("google_books", base_url, rate_per_second, **kwargs)
+        self.api_key = api_key
+
+    def cover_url(self, isbn: str):
+        """Returns the thumbnail URL for a book, or None if Google Books has no cover for it."""
+        data = self.get_json("/books/v1/volumes", {"q": f"isbn:{isbn}", "key": self.api_key})
+        items = (data or {}).get("items") or []
+        return items[0].get("volumeInfo", {}).get("imageLinks", {}).get("thumbnail") if items else None
@@ -0,0 +1,37 @@
+import threading
+from collections import deque
+
+import numpy as np
+
+
+class LatencyStats:
+    """Rolling latency percentiles per named path, plus plain event counters.
+
+    Keeps the last `window` samples of each path, so percentiles follow current behaviour
+    while memory stays fixed.
+    """
+
+    def __init__(self, window: int = 2048):
+        self.window = window
+        self._samples = {}
+        self._totals = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def record(self, path: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(path, deque(maxlen=self.window)).append(seconds)
+            self._totals[path] = self._totals.get(path, 0) + 1
+
+    def incr(self, counter: str):
+        with self._lock:
+            self._counters[counter] = self._counters.get(counter, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            samples = {path: np.array(values) * 1000 for path, values in self._samples.items()}
+            totals, counters = dict(self._totals), dict(self._counters)
+        latency = {path: {"count": totals[path], **{f"p{p}_ms": round(float(np.percentile(values, p)), 2) for p in (50, 95, 99)},
+                          "max_ms": round(float(values.max()), 2)}
+                   for path, values in samples.items()}
+        return {"latency": latency, "counts": counters}
@@ -0,0 +1,141 @@
+"""Precomputed item-to-item neighbour tables for single-seed recommendations.
+
+"Items similar to X" depends only on the catalog (embeddings, pop_norm) and the static hybrid
+weights, so it is computed once offline for every row instead of on each request:
+    python neighbors.py                 # movies, books and (if built) music, skipping fresh tables
+    python neighbors.py --only movies --k 200
+Each table is written next to its catalog artifact in data/catalog/<name>/:
+    neighbors_ids.npy     int32 (rows x k) neighbour row numbers, best first (the row itself excluded)
+    neighbors_scores.npy  float16 (rows x k) hybrid scores, for reference
+    neighbors.json        k, hybrid weights and the catalog build it was computed from (written last)
+A table is only used while it matches the loaded catalog: rebuilding the catalog (new embeddings,
+ratings or popularity) makes it stale until this job runs again, and the API scans meanwhile.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from catalog import CATALOGS, MUSIC_SOURCES, _write_atomic, build_fingerprint, load_catalog
+from scoring import ALPHA, BETA
+
+NEIGHBORS_K = 100
+
+
+def compute_neighbors(matrix: np.ndarray, pop_norm: np.ndarray, k: int = NEIGHBORS_K, tile_bytes: int = 64 * 2**20,
+                      workers: int = None, alpha: float = ALPHA, beta: float = BETA):
+    """Returns (ids int32, scores float16), both (rows x k): every row's top-k hybrid neighbours, best first.
+
+    Rows are processed in tiles whose (tile x N) score block stays under `tile_bytes`; tiles run on
+    `workers` threads (NumPy's matrix product and partitioning release the GIL).
+    """
+    n_rows = len(matrix)
+    k = min(k, n_rows - 1)
+    ids = np.empty((n_rows, k), dtype=np.int32)
+    scores = np.empty((n_rows, k), dtype=np.float16)
+    if k <= 0: return ids, scores
+    tile = max(1, tile_bytes // (4 * n_rows))
+    weighted_pop = beta * np.asarray(pop_norm, dtype=np.float32)
+
+    def fill(start):
+        stop = min(start + tile, n_rows)
+        block = matrix[start:stop] @ matrix.T
+        block *= alpha
+        block += weighted_pop
+        block[np.arange(stop - start), np.arange(start, stop)] = -np.inf  # Never recommend the seed itself
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        ids[start:stop] = np.take_along_axis(top, order, axis=1)
+        scores[start:stop] = np.take_along_axis(top_scores, order, axis=1)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count(), thread_name_prefix="neighbors") as pool:
+        list(pool.map(fill, range(0, n_rows, tile)))
+    return ids, scores
+
+
+class NeighborTable:
+    """Memory-mapped top-k neighbour rows of one catalog; answers "similar to row i" in O(k)."""
+
+    def __init__(self, ids: np.ndarray, scores: np.ndarray):
+        self.ids = ids
+        self.scores = scores
+
+    @property
+    def k(self):
+        return self.ids.shape[1]
+
+    def neighbors(self, row: int, n: int):
+        """The n best neighbours of a row, or None if the table holds fewer than n per row."""
+        if n > self.k: return None
+        return np.asarray(self.ids[row, :n], dtype=np.intp)
+
+
+def _fingerprint(name: str, catalog_dir: str):
+    """Identifies the catalog build a table belongs to; every rebuild writes new embeddings and pop_norm."""
+    return dict(build_fingerprint(name, catalog_dir), alpha=ALPHA, beta=BETA)
+
+
+def stale_reason(name: str, catalog_dir: str = "data/catalog"):
+    """Returns why the neighbour table of a catalog can't be used, or None."""
+    try:
+        with open(os.path.join(catalog_dir, name, "neighbors.json")) as f:
+            meta = json.load(f)
+        fingerprint = _fingerprint(name, catalog_dir)
+    except (FileNotFoundError, ValueError):
+        return "no neighbour table"
+    if any(meta.get(key) != value for key, value in fingerprint.items()):
+        return "catalog or hybrid weights changed since the table was built"
+    return None
+
+
+def build_neighbors(name: str, catalog_dir: str = "data/catalog", k: int = NEIGHBORS_K, workers: int = None):
+    """Computes and writes the neighbour table for a (freshly loaded or rebuilt) catalog."""
+    _, store, pop_norm = load_catalog(name, catalog_dir)
+    started = time.perf_counter()
+    ids, scores = compute_neighbors(store.matrix, pop_norm, k, workers=workers)
+
+    out_dir = os.path.join(catalog_dir, name)
+    meta_path = os.path.join(out_dir, "neighbors.json")
+    if os.path.exists(meta_path): os.remove(meta_path)
+    _write_atomic(os.path.join(out_dir, "neighbors_ids.npy"), lambda f: np.save(f, ids))
+    _write_atomic(os.path.join(out_dir, "neighbors_scores.npy"), lambda f: np.save(f, scores))
+    meta = dict(_fingerprint(name, catalog_dir), k=int(ids.shape[1]))
+    _write_atomic(meta_path, lambda f: json.dump(meta, f, indent=2), mode="w")
+    print(f"Built {name} neighbour table: {ids.shape[0]} rows x {ids.shape[1]} in {time.perf_counter() - started:.1f}s")
+
+
+def load_neighbors(name: str, catalog_dir: str = "data/catalog"):
+    """Memory-maps the neighbour table of a catalog, or returns None if it is missing or stale."""
+    reason = stale_reason(name, catalog_dir)
+    if reason is not None:
+        print(f"Not using {name} neighbour table ({reason}); run `python neighbors.py --only {name}`.")
+        return None
+    out_dir = os.path.join(catalog_dir, name)
+    return NeighborTable(np.load(os.path.join(out_dir, "neighbors_ids.npy"), mmap_mode="r"),
+                         np.load(os.path.join(out_dir, "neighbors_scores.npy"), mmap_mode="r"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", choices=sorted(CATALOGS), default=None)
+    parser.add_argument("--catalog-dir", default="data/catalog")
+    parser.add_argument("--k", type=int, default=NEIGHBORS_K)
+    parser.add_argument("--workers", type=int, default=None, help="Tile threads (default: one per core)")
+    parser.add_argument("--force", action="store_true", help="Rebuild tables that are still fresh (e.g. to change --k)")
+    args = parser.parse_args()
+    for name in ([args.only] if args.only else CATALOGS):
+        if name == "music" and not args.only and not os.path.exists(MUSIC_SOURCES[0]):
+            print("Skipping music: no music embeddings generated yet.")
+            continue
+        if not args.force and stale_reason(name, args.catalog_dir) is None:
+            print(f"{name} neighbour table is up to date.")
+            continue
+        build_neighbors(name, args.catalog_dir, args.k, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -349,18 +349,37 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import os
+import sys
+import time
 from dotenv import load_dotenv
 import google.generativeai as genai
 from sklearn.metrics.pairwise import cosine_similarity
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 
 # --- CONFIGURATION & DATA LOADING ---
 load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
 
+# Share the API's on-disk cache, so posters and explanations fetched by either app survive restarts
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cache import PersistentStore
+from metadata_client import TMDbClient, UpstreamError
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "data/cache.sqlite3")
+IMAGE_CACHE_TTL = float(os.getenv("IMAGE_CACHE_TTL", str(7 * 24 * 3600)))
+EXPLANATION_CACHE_TTL = float(os.getenv("EXPLANATION_CACHE_TTL", str(30 * 24 * 3600)))
+store = PersistentStore(CACHE_DB_PATH) if CACHE_DB_PATH else None
+tmdb_client = TMDbClient(TMDB_API_KEY, os.getenv("TMDB_API_BASE", "https://api.themoviedb.org"))
+
+def read_through(namespace: str, key, fetch, ttl: float):
+    """Returns the stored value for key, or calls fetch() and writes its (non-None) result behind."""
+    if store is not None:
+        stored = store.get(namespace, key)
+        if stored is not None: return stored[0]
+    value = fetch()
+    if store is not None and value is not None:
+        store.put(namespace, key, value, time.time() + ttl)
+    return value
+
 @st.cache_data
 def load_data():
     """Loads all data files, merges them, and cleans up missing IDs."""
@@ -375,23 +394,17 @@ def load_data():
 
 @st.cache_data
 def fetch_poster(tmdb_id: int):
-    """Fetches a movie poster URL from the TMDb API with a retry strategy."""
-    retry_strategy = Retry(total=3, status_forcelist=[429, 500, 502, 503, 504], backoff_factor=1)
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-    session = requests.Session()
-    session.mount("https://", adapter)
-    session.mount("http://", adapter)
-    url = f"https://api.themoviedb.org/3/movie/{tmdb_id}?api_key={TMDB_API_KEY}&language=en-US"
+    """Fetches a movie poster URL, reading through the shared on-disk cache."""
+    poster_url = read_through("posters", int(tmdb_id), lambda: fetch_poster_from_tmdb(tmdb_id), IMAGE_CACHE_TTL)
+    return poster_url or "https://via.placeholder.com/500x750.png?text=No+Poster+Found"
+
+def fetch_poster_from_tmdb(tmdb_id: int):
+    """Fetches a movie poster URL from the TMDb API over the shared pooled session."""
     try:
-        response = session.get(url)
-        response.raise_for_status()
-        data = response.json()
-        poster_path = data.get('poster_path')
-        if poster_path:
-            return f"https://image.tmdb.org/t/p/w500/{poster_path}"
-    except requests.exceptions.RequestException as e:
-        print(f"API request failed after retries for tmdbId {tmdb_id}: {e}")
-    return "https://via.placeholder.com/500x750.png?text=No+Poster+Found"
+        return tmdb_client.poster_url(tmdb_id)
+    except UpstreamError as e:
+        print(f"API request failed for tmdbId {tmdb_id}: {e}")
+        return None
 
 # --- LOGIC FUNCTIONS ---
 chat_model = genai.GenerativeModel('gemini-1.5-flash-latest')
@@ -413,11 +426,16 @@ def get_recommendations(title: str, df: pd.DataFrame, top_n: int = 5):
 def get_recommendation_explanation(original_movie: str, recommended_movie: str):
     """Generates a brief explanation for why a movie is recommended."""
     prompt = f"You are a friendly movie expert. In one concise sentence, explain why someone who liked '{original_movie}' might also enjoy '{recommended_movie}'."
-    try:
-        response = chat_model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        return f"Could not generate explanation: {e}"
+    errors = []
+    def generate():
+        try:
+            return chat_model.generate_content(prompt).text
+        except Exception as e:
+            errors.append(e)
+            return None
+    # Same key as api.get_recommendation_explanation, so the two apps share explanations
+    explanation = read_through("explanations", f"exp_{original_movie}_{recommended_movie}", generate, EXPLANATION_CACHE_TTL)
+    return explanation if explanation is not None else f"Could not generate explanation: {errors[0]}"
 
 @st.cache_data
 def find_movies_by_vibe(vibe_text: str, df: pd.DataFrame, top_n: int = 5):
@@ -0,0 +1,91 @@
+"""Append-only checkpoints for the embedding generators.
+
+Each checkpoint is written as a new part file next to the output, e.g.
+    data/movie_embeddings.parquet.parts/part-00000.parquet
+through a temp file and an atomic rename, so a checkpoint costs the size of that batch only and
+a crash mid-write can never damage earlier progress. `compact()` merges the compacted output and
+all parts into the output file (again via temp file + rename) and then removes the parts.
+Resuming reads only the id and content-hash columns of the output and the parts.
+"""
+import glob
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+
+class PartCheckpoint:
+    def __init__(self, output_file: str, id_column: str):
+        self.output_file = output_file
+        self.id_column = id_column
+        self.parts_dir = f"{output_file}.parts"
+
+    def part_files(self):
+        return sorted(glob.glob(os.path.join(self.parts_dir, "part-*.parquet")))
+
+    def _files(self):
+        return ([self.output_file] if os.path.exists(self.output_file) else []) + self.part_files()
+
+    def processed_ids(self):
+        """The ids already embedded, read from the id column alone."""
+        return set(self.processed_hashes())
+
+    def processed_hashes(self, hash_column: str = "content_hash"):
+        """{id: content hash} for every row already embedded; later parts override earlier rows.
+
+        Rows written before hashes were stored map to None, so they never match a current hash.
+        """
+        hashes = {}
+        for path in self._files():
+            has_hash = hash_column in pq.read_schema(path).names
+            table = pq.read_table(path, columns=[self.id_column] + ([hash_column] if has_hash else []))
+            ids = table.column(self.id_column).to_pylist()
+            hashes.update(zip(ids, table.column(hash_column).to_pylist() if has_hash else [None] * len(ids)))
+        return hashes
+
+    def _next_part_path(self):
+        os.makedirs(self.parts_dir, exist_ok=True)
+        existing = self.part_files()
+        number = int(os.path.basename(existing[-1])[5:10]) + 1 if existing else 0
+        return os.path.join(self.parts_dir, f"part-{number:05d}.parquet")
+
+    def write_part(self, records: list):
+        """Writes one checkpoint of newly embedded rows as a new part file. Returns its path."""
+        path = self._next_part_path()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        pd.DataFrame(records).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        return path
+
+    def add_part(self, path: str):
+        """Moves an existing parquet file (e.g. a finished shard's output) in as the next part."""
+        part_path = self._next_part_path()
+        os.replace(path, part_path)
+        return part_path
+
+    def compact(self, keep_ids: set = None):
+        """Merges the output file and every part into the output file, then removes the parts.
+
+        Rows are kept in the order they were written; if an id appears twice (a re-embedded row),
+        the newest row wins. With `keep_ids`, rows whose id is no longer in the source are dropped.
+        Returns the number of rows in the compacted output.
+        """
+        parts = self.part_files()
+        has_output = os.path.exists(self.output_file)
+        if not parts and (keep_ids is None or not has_output or self.processed_ids() <= keep_ids):
+            return pq.read_metadata(self.output_file).num_rows if has_output else 0
+        combined_df = pd.concat([pd.read_parquet(path) for path in self._files()], ignore_index=True)
+        combined_df = combined_df.drop_duplicates(subset=[self.id_column], keep='last')
+        if keep_ids is not None:
+            removed = ~combined_df[self.id_column].isin(keep_ids)
+            if removed.any():
+                print(f"Dropping {int(removed.sum())} rows whose source row no longer exists.")
+            combined_df = combined_df[~removed]
+        tmp_path = f"{self.output_file}.{os.getpid()}.tmp"
+        combined_df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.output_file)
+        for path in parts:
+            os.remove(path)
+        if parts and not os.listdir(self.parts_dir):
+            os.rmdir(self.parts_dir)
+        return len(combined_df)
@@ -0,0 +1,250 @@
+"""One embedding-generation engine for every domain, driven by domain adapters.
+
+An adapter says where a domain's rows come from, which column identifies a row, what text to
+embed for it and what to store next to the vector. The engine does the rest: resume from
+checkpoints, batched/concurrent embedding (embedding_pipeline.py), append-only checkpoints
+(embedding_checkpoint.py) and sharding.
+
+Usage (from the repo root):
+    python python/embedding_job.py movies
+    python python/embedding_job.py books --shard 2/8        # this process embeds shard 2 of 8
+    python python/embedding_job.py books --merge 8          # fold the 8 shard outputs into the output
+    python python/embedding_job.py music --processes 4      # run 4 local shard processes, then merge
+Every stored embedding carries a content_hash of the model name and the exact prompt text, so a
+rerun re-embeds only new rows and rows whose title/genres/authors/... changed, and drops rows
+whose source row disappeared: a full refresh costs as much as the diff.
+
+Rows are assigned to shards by a stable hash of their id, so every process (on any machine)
+agrees on the partition and reruns of a shard resume where it stopped. Each shard process has
+its own rate limiter, so set EMBED_RATE to the per-process share of the quota.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import zlib
+
+import pandas as pd
+from dotenv import load_dotenv
+from tqdm import tqdm
+
+from embedding_checkpoint import PartCheckpoint
+from embedding_pipeline import EmbeddingPipeline, content_hash
+
+CHECKPOINT_INTERVAL = 1000  # Rows per checkpoint part (about ten embed batches)
+
+
+# --- DOMAIN ADAPTERS ---
+
+class DomainAdapter:
+    """Describes one embedding domain. Subclasses override `prepare`, `prompt` and `record`."""
+    name = None
+    label = None  # Plural noun for progress output
+    input_file = None
+    output_file = None
+    id_column = None
+
+    def load(self):
+        """Reads and cleans the input rows, one per id.
+
+        Only the first row of a repeated id is embedded (the Spotify CSV lists a track once per
+        genre): stored embeddings are keyed by id, so a second row with its own prompt would never
+        match its stored hash and be re-embedded on every run.
+        """
+        return self.prepare(pd.read_csv(self.input_file, on_bad_lines='skip')).drop_duplicates(subset=[self.id_column])
+
+    def prepare(self, df: pd.DataFrame):
+        return df
+
+    def prompt(self, row: dict):
+        raise NotImplementedError
+
+    def record(self, row: dict, embedding):
+        raise NotImplementedError
+
+
+class MovieAdapter(DomainAdapter):
+    name, label = "movies", "movies"
+    input_file, output_file, id_column = 'data/movies.csv', 'data/movie_embeddings.parquet', 'movieId'
+
+    def prompt(self, row):
+        return f"Title: {row['title']}\nGenres: {row['genres']}"
+
+    def record(self, row, embedding):
+        return {'movieId': row['movieId'], 'title': row['title'], 'embedding': embedding}
+
+
+class BookAdapter(DomainAdapter):
+    name, label = "books", "books"
+    input_file, output_file, id_column = 'data/books.csv', 'data/book_embeddings.parquet', 'bookID'
+
+    def prepare(self, df):
+        # Drop rows where essential information is missing to prevent errors
+        original_rows = len(df)
+        df = df.dropna(subset=['bookID', 'title', 'authors', 'isbn'])
+        print(f"Data cleaning complete. Removed {original_rows - len(df)} rows with missing essential data.")
+        return df
+
+    def prompt(self, row):
+        return f"Title: {row['title']}\nAuthor(s): {row['authors']}"
+
+    def record(self, row, embedding):
+        return {'bookID': row['bookID'], 'title': str(row['title']), 'authors': str(row['authors']),
+                'isbn': row['isbn'], 'embedding': embedding}
+
+
+class MusicAdapter(DomainAdapter):
+    name, label = "music", "songs"
+    input_file, output_file, id_column = 'data/spotify_tracks.csv', 'data/music_embeddings.parquet', 'track_id'
+
+    def prepare(self, df):
+        return df.dropna(subset=['track_id', 'track_name', 'artists', 'album_name', 'track_genre'])
+
+    def prompt(self, row):
+        return (f"Track: {row['track_name']}\nArtist(s): {row['artists']}\n"
+                f"Album: {row['album_name']}\nGenre: {row['track_genre']}")
+
+    def record(self, row, embedding):
+        return {'track_id': row['track_id'], 'track_name': row['track_name'], 'artists': row['artists'],
+                'embedding': embedding}
+
+
+class CustomMovieAdapter(DomainAdapter):
+    name, label = "custom", "custom movies"
+    input_file, output_file, id_column = 'data/custom_movies.csv', 'data/custom_embeddings.parquet', 'tmdbId'
+
+    def prompt(self, row):
+        return f"Title: {row['title']}\nGenres: {row['genres']}"
+
+    def record(self, row, embedding):
+        return {'title': row['title'], 'embedding': embedding, 'genres': row['genres'], 'tmdbId': row['tmdbId']}
+
+
+ADAPTERS = {adapter.name: adapter for adapter in (MovieAdapter(), BookAdapter(), MusicAdapter(), CustomMovieAdapter())}
+
+
+# --- SHARDING ---
+
+def shard_of(row_id, shard_count: int):
+    """Stable shard number for a row id (crc32, unlike hash(), is the same in every process)."""
+    return zlib.crc32(str(row_id).encode("utf-8")) % shard_count
+
+def parse_shard(value: str):
+    """Parses "i/N" into (i, N)."""
+    index, count = (int(part) for part in value.split("/"))
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"shard index must be in [0, {count}), got {index}")
+    return index, count
+
+def shard_output(adapter: DomainAdapter, shard):
+    index, count = shard
+    root, ext = os.path.splitext(adapter.output_file)
+    return f"{root}.shard-{index}-of-{count}{ext}"
+
+
+# --- ENGINE ---
+
+def run_job(adapter: DomainAdapter, shard=None, pipeline: EmbeddingPipeline = None):
+    """Embeds every row of the adapter's input (or of one shard of it) that is new or has changed."""
+    print(f"Loading {adapter.label} from '{adapter.input_file}'...")
+    df = adapter.load()
+    live_ids = set(df[adapter.id_column])
+    output_file = adapter.output_file
+    done = {}
+    if shard is not None:
+        df = df[[shard_of(row_id, shard[1]) == shard[0] for row_id in df[adapter.id_column]]]
+        output_file = shard_output(adapter, shard)
+        # Rows already in the merged output count as done for every shard
+        done = PartCheckpoint(adapter.output_file, adapter.id_column).processed_hashes()
+
+    # Resume: only the id and content_hash columns of the output and its checkpoint parts are read
+    checkpoint = PartCheckpoint(output_file, adapter.id_column)
+    done.update(checkpoint.processed_hashes())
+    if done:
+        print(f"Loaded progress for {len(done)} existing embeddings.")
+
+    pipeline = pipeline or EmbeddingPipeline.from_env()
+    all_rows = df.to_dict('records')
+    prompts = [adapter.prompt(row) for row in all_rows]
+    hashes = [content_hash(pipeline.backend.model, prompt) for prompt in prompts]
+    todo = [i for i, row in enumerate(all_rows) if done.get(row[adapter.id_column]) != hashes[i]]
+    changed = sum(1 for i in todo if all_rows[i][adapter.id_column] in done)
+    # Shards only see their own rows; removed rows are dropped when the shards are merged
+    keep_ids = live_ids if shard is None else None
+    if not todo:
+        print(f"All {adapter.label} are up to date. Nothing to embed.")
+        checkpoint.compact(keep_ids)  # Merge parts left behind by an interrupted run, drop removed rows
+        return
+
+    print(f"Starting to process {len(todo)} {adapter.label} ({len(todo) - changed} new, {changed} changed)...")
+    rows = [all_rows[i] for i in todo]
+    row_hashes = [hashes[i] for i in todo]
+    pending = []
+    try:
+        with tqdm(total=len(rows), desc=f"Processing {adapter.label}") as progress:
+            for positions, embeddings in pipeline.embed([prompts[i] for i in todo]):
+                for position, embedding in zip(positions, embeddings):
+                    record = adapter.record(rows[position], embedding)
+                    record['content_hash'] = row_hashes[position]
+                    pending.append(record)
+                progress.update(len(positions))
+                if len(pending) >= CHECKPOINT_INTERVAL:
+                    checkpoint.write_part(pending)
+                    pending = []
+    finally:
+        # Also when a batch failed for good, so a rerun resumes after it
+        if pending:
+            checkpoint.write_part(pending)
+
+    total = checkpoint.compact(keep_ids)
+    print(f"\nProcessing complete: {total} {adapter.label} in '{output_file}' ({pipeline.retries} retried calls).")
+
+def merge_shards(adapter: DomainAdapter, shard_count: int):
+    """Folds every finished shard output into the adapter's output file, then removes the shard files."""
+    shard_files = [shard_output(adapter, (index, shard_count)) for index in range(shard_count)]
+    unfinished = [path for path in shard_files if os.path.exists(f"{path}.parts")]
+    if unfinished:
+        raise SystemExit(f"Shards still have unmerged checkpoint parts (rerun them first): {unfinished}")
+    checkpoint = PartCheckpoint(adapter.output_file, adapter.id_column)
+    for path in shard_files:
+        if os.path.exists(path):
+            checkpoint.add_part(path)
+    total = checkpoint.compact(keep_ids=set(adapter.load()[adapter.id_column]))
+    print(f"Merged {shard_count} shards: {total} {adapter.label} in '{adapter.output_file}'.")
+
+def run_local_shards(adapter: DomainAdapter, processes: int):
+    """Runs `processes` shard processes of this script in parallel, then merges their outputs."""
+    commands = [[sys.executable, os.path.abspath(__file__), adapter.name, "--shard", f"{index}/{processes}"]
+                for index in range(processes)]
+    workers = [subprocess.Popen(command) for command in commands]
+    failed = [index for index, worker in enumerate(workers) if worker.wait() != 0]
+    if failed:
+        raise SystemExit(f"Shards {failed} failed; rerun them with --shard i/{processes}, then --merge {processes}.")
+    merge_shards(adapter, processes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("domain", choices=sorted(ADAPTERS))
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--shard", type=parse_shard, default=None, metavar="I/N", help="Embed only shard I of N")
+    group.add_argument("--merge", type=int, default=None, metavar="N", help="Merge the outputs of N shards")
+    group.add_argument("--processes", type=int, default=None, metavar="N", help="Run N local shard processes, then merge")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    if os.getenv("EMBEDDING_BACKEND", "gemini") == "gemini":
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+
+    adapter = ADAPTERS[args.domain]
+    if args.merge:
+        merge_shards(adapter, args.merge)
+    elif args.processes:
+        run_local_shards(adapter, args.processes)
+    else:
+        run_job(adapter, args.shard)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Shared batched embedding pipeline for the generate_*_embeddings.py scripts.
+
+Texts are sent in batches (one embed call per batch), a bounded number of batches are in flight
+at once, and every call first takes a token from an adaptive rate limiter that halves its rate on
+quota errors and creeps back up on success. Quota/transient errors are retried with exponential
+backoff; a batch that still fails raises instead of dropping rows.
+
+Tuned through the environment:
+    EMBEDDING_BACKEND   "gemini" (default) or "fake" (deterministic local vectors, no API calls)
+    EMBED_BATCH_SIZE    texts per embed call (default 100, the batchEmbedContents maximum)
+    EMBED_CONCURRENCY   embed calls in flight at once (default 4)
+    EMBED_RATE          starting embed calls per second (default 5); adapts between 0.05 and 4x this
+"""
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+EMBEDDING_MODEL = 'text-embedding-004'
+
+
+class EmbeddingError(Exception):
+    """An embed call failed for good (non-retryable error, or retries exhausted)."""
+
+
+class RetryableEmbeddingError(EmbeddingError):
+    """Quota exhausted / rate limited / transient server error: worth retrying after a backoff."""
+
+    def __init__(self, message: str, throttled: bool = True):
+        super().__init__(message)
+        self.throttled = throttled
+
+
+# --- BACKENDS ---
+
+class GeminiBackend:
+    """Embeds a batch of texts with one genai.embed_content call."""
+
+    def __init__(self, model: str = EMBEDDING_MODEL):
+        import google.generativeai as genai
+        from google.api_core import exceptions as api_exceptions
+        self.genai = genai
+        self.model = model
+        self.throttled_errors = (api_exceptions.ResourceExhausted, api_exceptions.TooManyRequests)
+        self.transient_errors = (api_exceptions.ServiceUnavailable, api_exceptions.InternalServerError,
+                                 api_exceptions.DeadlineExceeded)
+
+    def embed(self, texts):
+        try:
+            result = self.genai.embed_content(model=self.model, content=list(texts))
+        except self.throttled_errors as e:
+            raise RetryableEmbeddingError(str(e), throttled=True) from e
+        except self.transient_errors as e:
+            raise RetryableEmbeddingError(str(e), throttled=False) from e
+        except Exception as e:
+            raise EmbeddingError(str(e)) from e
+        embeddings = result['embedding']
+        if len(embeddings) != len(texts):
+            raise EmbeddingError(f"asked for {len(texts)} embeddings, got {len(embeddings)}")
+        return embeddings
+
+
+class FakeBackend:
+    """Deterministic local embeddings for tests and benchmarks: the same text always maps to the
+    same unit vector. `latency` (seconds per call) and `quota_error_rate` imitate the real API."""
+
+    def __init__(self, dim: int = 768, latency: float = 0.0, quota_error_rate: float = 0.0, seed: int = 0):
+        self.model = f"fake-{dim}"
+        self.dim = dim
+        self.latency = latency
+        self.quota_error_rate = quota_error_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def embed(self, texts):
+        with self._lock:
+            self.calls += 1
+            throttled = self._random.random() < self.quota_error_rate
+        if self.latency: time.sleep(self.latency)
+        if throttled:
+            raise RetryableEmbeddingError("429 Resource has been exhausted (fake quota)")
+        return [self.vector(text) for text in texts]
+
+    def vector(self, text: str):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+
+def content_hash(model: str, text: str):
+    """Identifies an embedding by what produced it: the model name and the exact text embedded."""
+    return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+
+def make_backend(name: str = None):
+    name = name or os.getenv("EMBEDDING_BACKEND", "gemini")
+    if name == "fake":
+        return FakeBackend()
+    if name == "gemini":
+        return GeminiBackend()
+    raise ValueError(f"Unknown embedding backend '{name}' (expected 'gemini' or 'fake')")
+
+
+# --- RATE LIMITING ---
+
+class AdaptiveRateLimiter:
+    """Token bucket whose refill rate adapts to the upstream quota (AIMD).
+
+    Each throttled call halves the rate (down to `min_rate`); each success adds `increase`
+    calls/second back (up to `max_rate`), so throughput settles just under the real quota.
+    """
+
+    def __init__(self, rate: float, min_rate: float = 0.05, max_rate: float = None, increase: float = None):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate * 4
+        self.increase = increase or max(rate * 0.05, 0.01)
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a call may be made."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(1.0, self.tokens + (now - self.updated) * self.rate)  # Burst of one: calls stay evenly spaced
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+
+# --- PIPELINE ---
+
+class EmbeddingPipeline:
+    def __init__(self, backend=None, batch_size: int = 100, concurrency: int = 4, rate: float = 5.0,
+                 max_retries: int = 8, base_backoff: float = 1.0, max_backoff: float = 60.0):
+        self.backend = backend or make_backend()
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.limiter = AdaptiveRateLimiter(rate)
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.retries = 0
+
+    @classmethod
+    def from_env(cls, backend=None):
+        return cls(backend, batch_size=int(os.getenv("EMBED_BATCH_SIZE", "100")),
+                   concurrency=int(os.getenv("EMBED_CONCURRENCY", "4")), rate=float(os.getenv("EMBED_RATE", "5")))
+
+    def _embed_batch(self, texts):
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            try:
+                embeddings = self.backend.embed(texts)
+            except RetryableEmbeddingError as e:
+                if e.throttled: self.limiter.on_throttle()
+                if attempt == self.max_retries:
+                    raise EmbeddingError(f"giving up on a batch of {len(texts)} after {attempt + 1} attempts: {e}") from e
+                self.retries += 1
+                # Exponential backoff with jitter, so concurrent workers don't retry in lockstep
+                time.sleep(min(self.max_backoff, self.base_backoff * 2 ** attempt) * random.uniform(0.5, 1.0))
+                continue
+            self.limiter.on_success()
+            return embeddings
+
+    def embed(self, texts):
+        """Embeds `texts`, yielding (positions, embeddings) per batch as batches complete.
+
+        `positions` index into `texts`. At most `concurrency` batches are in flight, so memory
+        stays bounded however long the input is. Raises EmbeddingError if a batch fails for good.
+        """
+        texts = list(texts)
+        starts = iter(range(0, len(texts), self.batch_size))
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embed") as pool:
+            pending = {}
+
+            def submit_next():
+                start = next(starts, None)
+                if start is None: return False
+                batch = texts[start:start + self.batch_size]
+                pending[pool.submit(self._embed_batch, batch)] = range(start, start + len(batch))
+                return True
+
+            for _ in range(self.concurrency):
+                if not submit_next(): break
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    positions = pending.pop(future)
+                    embeddings = future.result()  # Re-raises EmbeddingError; the pool waits for in-flight calls
+                    submit_next()
+                    yield positions, embeddings
@@ -0,0 +1,106 @@
+"""Per-movie rating counts and averages, aggregated from ratings CSVs in bounded memory.
+
+Ratings are streamed in chunks with narrow dtypes (int32 ids, float32 ratings) and summed into
+arrays indexed by movieId, so peak memory is one chunk plus two arrays of max(movieId) entries,
+not the whole ratings file. Totals are persisted together with the size/mtime of every file
+they include: a new ratings file (e.g. data/ratings_2025.csv) is folded in on its own, while a
+changed or removed file triggers a full rebuild.
+"""
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+RATINGS_PATTERN = "data/ratings*.csv"
+CHUNK_ROWS = 2_000_000
+
+
+class RatingsStats:
+    def __init__(self, sums: np.ndarray = None, counts: np.ndarray = None, files: dict = None):
+        self.sums = sums if sums is not None else np.zeros(0, dtype=np.float64)
+        self.counts = counts if counts is not None else np.zeros(0, dtype=np.int64)
+        self.files = files or {}  # path -> [size, mtime_ns] of every file already summed in
+
+    def _grow(self, size: int):
+        if size > len(self.sums):
+            self.sums = np.concatenate([self.sums, np.zeros(size - len(self.sums), dtype=np.float64)])
+            self.counts = np.concatenate([self.counts, np.zeros(size - len(self.counts), dtype=np.int64)])
+
+    def add_file(self, path: str, chunk_rows: int = CHUNK_ROWS):
+        """Streams one ratings CSV into the running sums and counts. Returns the number of ratings read."""
+        total = 0
+        chunks = pd.read_csv(path, usecols=['movieId', 'rating'], dtype={'movieId': np.int32, 'rating': np.float32},
+                             chunksize=chunk_rows)
+        for chunk in chunks:
+            ids = chunk['movieId'].to_numpy()
+            if not len(ids): continue
+            self._grow(int(ids.max()) + 1)
+            size = len(self.sums)
+            self.sums += np.bincount(ids, weights=chunk['rating'].to_numpy(), minlength=size)
+            self.counts += np.bincount(ids, minlength=size)
+            total += len(ids)
+        stat = os.stat(path)
+        self.files[path] = [stat.st_size, stat.st_mtime_ns]
+        return total
+
+    def lookup(self, movie_ids):
+        """Returns (average rating, rating count) arrays for the given ids; movies without ratings get NaN / 0."""
+        ids = np.asarray(movie_ids, dtype=np.int64)
+        known = (ids >= 0) & (ids < len(self.counts))
+        counts = np.zeros(len(ids), dtype=np.int64)
+        sums = np.zeros(len(ids), dtype=np.float64)
+        counts[known] = self.counts[ids[known]]
+        sums[known] = self.sums[ids[known]]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            averages = np.where(counts > 0, sums / counts, np.nan)
+        return averages, counts
+
+    def save(self, path: str):
+        """Writes the totals atomically (temp file + rename)."""
+        directory = os.path.dirname(path)
+        if directory: os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, sums=self.sums, counts=self.counts,
+                     file_paths=np.array(list(self.files), dtype=str),
+                     file_states=np.array(list(self.files.values()), dtype=np.int64).reshape(-1, 2))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        """Loads saved totals, or returns None if there are none."""
+        if not os.path.exists(path): return None
+        with np.load(path) as data:
+            files = {str(p): [int(size), int(mtime)] for p, (size, mtime) in zip(data['file_paths'], data['file_states'])}
+            return cls(data['sums'], data['counts'], files)
+
+
+def update_ratings_stats(stats_path: str, pattern: str = RATINGS_PATTERN):
+    """Brings the persisted totals up to date with the ratings files on disk and returns them.
+
+    Files already summed in are skipped; new files are added incrementally. If a file that was
+    summed in has changed or disappeared, its old contribution can't be subtracted, so everything
+    is re-aggregated from scratch.
+    """
+    paths = sorted(glob.glob(pattern))
+    stats = RatingsStats.load(stats_path)
+    if stats is not None:
+        for path, state in stats.files.items():
+            try:
+                stat = os.stat(path)
+                current = [stat.st_size, stat.st_mtime_ns]
+            except FileNotFoundError:
+                current = None
+            if current != state:
+                print(f"{path} changed since ratings were aggregated; re-aggregating all ratings.")
+                stats = None
+                break
+    stats = stats or RatingsStats()
+
+    new_paths = [path for path in paths if path not in stats.files]
+    for path in new_paths:
+        print(f"Aggregated {stats.add_file(path)} ratings from {path}.")
+    if new_paths or not os.path.exists(stats_path):
+        stats.save(stats_path)
+    return stats
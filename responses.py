@@ -0,0 +1,143 @@
+from typing import List, Optional, Union
+
+import numpy as np
+import orjson
+import pandas as pd
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+# --- RESPONSE MODELS ---
+# Display fields only; `embedding` is opt-in (?include_embedding=true) since it is 768 floats per item.
+
+class MovieRecommendation(BaseModel):
+    movieId: Optional[int] = None
+    title: str
+    genres: Optional[str] = None
+    tmdbId: Optional[int] = None
+    avg_rating: Optional[float] = None
+    popularity: Optional[float] = None
+    posterUrl: Optional[str] = None
+    embedding: Optional[List[float]] = None
+
+class BookRecommendation(BaseModel):
+    bookID: Optional[int] = None
+    title: str
+    authors: Optional[str] = None
+    isbn: Optional[str] = None
+    avg_rating: Optional[float] = None
+    popularity: Optional[float] = None
+    coverUrl: Optional[str] = None
+    embedding: Optional[List[float]] = None
+
+class MusicRecommendation(BaseModel):
+    track_id: Optional[str] = None
+    title: str
+    artists: Optional[str] = None
+    album_name: Optional[str] = None
+    track_genre: Optional[str] = None
+    popularity: Optional[float] = None
+    embedding: Optional[List[float]] = None
+
+class MixedRecommendation(BaseModel):
+    category: str
+    similarity_score: Optional[float] = None
+    title: str
+    movieId: Optional[int] = None
+    genres: Optional[str] = None
+    tmdbId: Optional[int] = None
+    posterUrl: Optional[str] = None
+    bookID: Optional[int] = None
+    authors: Optional[str] = None
+    isbn: Optional[str] = None
+    coverUrl: Optional[str] = None
+    avg_rating: Optional[float] = None
+    popularity: Optional[float] = None
+    embedding: Optional[List[float]] = None
+
+class MovieRecommendationsResponse(BaseModel):
+    recommendations: List[MovieRecommendation]
+    explanation: Optional[str] = None
+    explanation_id: Optional[str] = None  # Deferred explanation: fetch from /explanations/{id}
+    served_by: Optional[str] = None  # /vibe only: "semantic" or "keyword"
+
+class BookRecommendationsResponse(BaseModel):
+    recommendations: List[BookRecommendation]
+    explanation: Optional[str] = None
+    explanation_id: Optional[str] = None  # Deferred explanation: fetch from /explanations/{id}
+
+class MusicRecommendationsResponse(BaseModel):
+    recommendations: List[MusicRecommendation]
+    explanation: Optional[str] = None
+    explanation_id: Optional[str] = None  # Deferred explanation: fetch from /explanations/{id}
+
+class MixedRecommendationsResponse(BaseModel):
+    recommendations: List[MixedRecommendation]
+    explanation: Optional[str] = None
+    explanation_id: Optional[str] = None  # Deferred explanation: fetch from /explanations/{id}
+
+class ExplanationStatus(BaseModel):
+    status: str  # "pending", "done", "failed" or "unknown" (expired or never issued)
+    explanation: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchRecommendationResult(BaseModel):
+    seed: Union[str, List[str]]
+    recommendations: List[dict]  # Items of the request's item_type
+    error: Optional[str] = None
+
+class BatchRecommendationsResponse(BaseModel):
+    results: List[BatchRecommendationResult]
+
+ITEM_MODELS = {"movie": MovieRecommendation, "book": BookRecommendation, "music": MusicRecommendation,
+               "mixed": MixedRecommendation}
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded with orjson; NaN becomes null and numpy arrays/scalars serialize natively."""
+    media_type = "application/json"
+
+    def render(self, content):
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def response_columns(kind: str, fields: Optional[str] = None, include_embedding: bool = False):
+    """Columns to return for an item kind: the model's display fields, or the requested `fields` subset."""
+    allowed = [name for name in ITEM_MODELS[kind].model_fields if name != "embedding"]
+    if fields:
+        requested = {name.strip() for name in fields.split(",")}
+        include_embedding = include_embedding or "embedding" in requested
+        allowed = [name for name in allowed if name in requested]
+    return allowed + (["embedding"] if include_embedding else [])
+
+
+def project_records(df: pd.DataFrame, kind: str, fields: Optional[str] = None, include_embedding: bool = False,
+                    embedding_rows=None):
+    """Projects a results frame down to the response columns and returns it as a list of dicts.
+
+    Catalog frames carry no `embedding` column; when vectors are requested they come from
+    `embedding_rows(df, kind)`, which returns one vector per result row.
+    """
+    columns = response_columns(kind, fields, include_embedding)
+    wants_embedding = "embedding" in columns
+    columns = [name for name in columns if name in df.columns and name != "embedding"]
+    records = df[columns].to_dict('records')
+    if wants_embedding:
+        vectors = embedding_rows(df, kind) if embedding_rows is not None else df['embedding'].tolist()
+        for record, vector in zip(records, vectors):
+            record["embedding"] = np.asarray(vector, dtype=np.float32)
+    return records
+
+
+def recommendation_response(df: pd.DataFrame, kind: str, explanation: Optional[str] = None,
+                            fields: Optional[str] = None, include_embedding: bool = False, embedding_rows=None,
+                            explanation_id: Optional[str] = None, served_by: Optional[str] = None):
+    """Builds the slim, orjson-encoded body shared by every recommendation endpoint."""
+    body = {"recommendations": project_records(df, kind, fields, include_embedding, embedding_rows)}
+    if explanation is not None:
+        body["explanation"] = explanation
+    if explanation_id is not None:
+        body["explanation_id"] = explanation_id
+    if served_by is not None:
+        body["served_by"] = served_by
+    return FastJSONResponse(body)
@@ -0,0 +1,72 @@
+import numpy as np
+
+# Hybrid weights shared by every recommendation path (content + popularity)
+ALPHA = 0.8  # Weight for content similarity
+BETA = 0.2   # Weight for popularity
+
+
+def normalize_rows(matrix: np.ndarray):
+    """L2-normalizes each row in place; zero rows are left as zeros."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def build_embedding_matrix(embeddings):
+    """Stacks a column of per-row embeddings into one contiguous, L2-normalized float32 matrix."""
+    matrix = np.ascontiguousarray(np.stack(list(embeddings)), dtype=np.float32)
+    return normalize_rows(matrix)
+
+
+def normalize_query(query_embedding):
+    """Returns a float32, unit-length copy of a single query vector."""
+    query = np.asarray(query_embedding, dtype=np.float32).ravel()
+    norm = np.linalg.norm(query)
+    return query / norm if norm > 0 else query
+
+
+def hybrid_scores(query_embedding, matrix: np.ndarray, pop_norm: np.ndarray, alpha: float = ALPHA, beta: float = BETA):
+    """Scores every catalog row as alpha * cosine similarity + beta * normalized popularity.
+
+    `matrix` must already be row-normalized, so cosine similarity is a single matrix-vector product.
+    """
+    similarities = matrix @ normalize_query(query_embedding)
+    return alpha * similarities + beta * pop_norm
+
+
+def top_k_indices(scores: np.ndarray, k: int, exclude=None):
+    """Returns the indices of the k highest scores, best first, never returning an index in `exclude`.
+
+    Uses argpartition (O(N)) and only sorts the k winners, instead of argsorting the whole array.
+    """
+    if exclude is not None and len(exclude):
+        scores = scores.copy()
+        scores[np.asarray(list(exclude), dtype=np.intp)] = -np.inf
+        k = min(k, int(np.isfinite(scores).sum()))
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+def batch_top_k(queries: np.ndarray, matrix: np.ndarray, pop_norm: np.ndarray, k: int, excludes=None,
+                tile_bytes: int = 64 * 2**20, alpha: float = ALPHA, beta: float = BETA):
+    """Hybrid top-k for many queries at once: one row of indices (best first) per query.
+
+    Queries are scored against the whole catalog as one (tile x N) matrix product per tile, with
+    tiles sized so a score block stays under `tile_bytes`. `excludes[i]` lists rows query i must
+    never return. Same scores and ordering as hybrid_scores + top_k_indices per query.
+    """
+    queries = normalize_rows(np.array(queries, dtype=np.float32, ndmin=2))
+    excludes = excludes or [()] * len(queries)
+    tile = max(1, tile_bytes // (4 * max(1, len(matrix))))
+    results = []
+    for start in range(0, len(queries), tile):
+        scores = queries[start:start + tile] @ matrix.T
+        scores *= alpha
+        scores += beta * pop_norm
+        for row, exclude in zip(scores, excludes[start:start + tile]):
+            results.append(top_k_indices(row, k, exclude=exclude))
+    return results
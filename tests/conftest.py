@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The API modules live at the repo root and the embedding jobs in python/, rather than in packages
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "python"))
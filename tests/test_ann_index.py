@@ -0,0 +1,27 @@
+import numpy as np
+
+from ann_index import IVFIndex, load_or_build_index
+
+
+def matrix(rows=500, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_index_is_reused_only_for_the_same_catalog_build(tmp_path):
+    path = str(tmp_path / "ann.ivf.npz")
+    build = {"catalog_built_at": 1700000000.0, "rows": 500}
+    saved = load_or_build_index(path, matrix(), build)
+    reloaded = IVFIndex.load(path, dict(build))
+    assert reloaded is not None and np.array_equal(reloaded.list_ids, saved.list_ids)
+    # A rebuild with slightly different vectors but the same shape still invalidates the index
+    assert IVFIndex.load(path, dict(build, catalog_built_at=1700000001.0)) is None
+    assert IVFIndex.load(path, dict(build, rows=501)) is None
+
+
+def test_indexes_from_the_old_checksum_format_are_rebuilt(tmp_path):
+    path = str(tmp_path / "ann.ivf.npz")
+    index = IVFIndex.build(matrix())
+    np.savez(path, centroids=index.centroids, list_offsets=index.list_offsets, list_ids=index.list_ids,
+             nprobe=index.nprobe, fingerprint=np.array([500.0, 16.0, 12.3456]))
+    assert IVFIndex.load(path, {"catalog_built_at": 1.0, "rows": 500}) is None
@@ -0,0 +1,78 @@
+import threading
+
+from cache import CacheRegistry, LRUCache, PersistentStore
+from deferred_jobs import DeferredJobs
+
+
+def make_jobs():
+    return DeferredJobs("test", LRUCache("results"), LRUCache("tickets", ttl=60))
+
+
+def test_result_within_the_wait_is_returned_and_cached():
+    jobs = make_jobs()
+    def compute():
+        jobs.cache.put("key", "value")
+        return "value"
+    assert jobs.request("key", compute, wait_for=5) == ("value", None)
+    assert jobs.request("key", lambda: "recomputed") == ("value", None)
+
+
+def test_slow_job_returns_a_ticket_that_resolves():
+    jobs = make_jobs()
+    release = threading.Event()
+    def compute():
+        release.wait(5)
+        jobs.cache.put("key", "value")
+        return "value"
+    result, ticket = jobs.request("key", compute)
+    assert result is None and ticket == DeferredJobs.ticket_id("key")
+    assert jobs.status(ticket) == ("pending", None)
+    assert jobs.request("key", compute) == (None, ticket)  # Identical requests share the job
+    release.set()
+    assert jobs.status(ticket, timeout=5) == ("done", "value")
+
+
+def test_exceptions_are_failed_tickets_not_results():
+    jobs = make_jobs()
+    def compute():
+        raise RuntimeError("quota exceeded")
+    result, ticket = jobs.request("key", compute, wait_for=5)
+    assert result is None
+    assert jobs.status(ticket, timeout=5) == ("failed", "quota exceeded")
+
+
+def test_unknown_ticket():
+    assert make_jobs().status("nope") == ("unknown", None)
+
+
+def make_worker(path):
+    """One API worker process's view: its own in-memory namespaces over the shared SQLite file."""
+    registry = CacheRegistry(PersistentStore(str(path)))
+    return DeferredJobs("test", registry.namespace("results", persistent=True),
+                        registry.namespace("tickets", ttl=60, persistent=True, write_through=True))
+
+
+def test_any_worker_resolves_a_ticket_another_issued(tmp_path):
+    issuer, other = make_worker(tmp_path / "cache.sqlite3"), make_worker(tmp_path / "cache.sqlite3")
+    release = threading.Event()
+    def compute():
+        release.wait(5)
+        issuer.cache.put("key", "value")
+        return "value"
+    _, ticket = issuer.request("key", compute)
+    assert other.status(ticket) == ("pending", None)
+    release.set()
+    assert other.status(ticket, timeout=5) == ("done", "value")
+
+
+def test_failures_are_visible_to_other_workers(tmp_path):
+    issuer, other = make_worker(tmp_path / "cache.sqlite3"), make_worker(tmp_path / "cache.sqlite3")
+    release = threading.Event()
+    def compute():
+        release.wait(5)
+        raise RuntimeError("quota exceeded")
+    _, ticket = issuer.request("key", compute)
+    assert other.status(ticket) == ("pending", None)
+    release.set()
+    assert other.status(ticket, timeout=5) == ("failed", "quota exceeded")
+    assert other.status("nope") == ("unknown", None)
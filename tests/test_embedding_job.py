@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+
+from embedding_checkpoint import PartCheckpoint
+from embedding_job import MusicAdapter, run_job
+from embedding_pipeline import EmbeddingPipeline, FakeBackend
+
+TRACKS = [
+    {"track_id": "a", "track_name": "Creep", "artists": "Radiohead", "album_name": "Pablo Honey", "track_genre": "alt-rock"},
+    {"track_id": "a", "track_name": "Creep", "artists": "Radiohead", "album_name": "Pablo Honey", "track_genre": "grunge"},
+    {"track_id": "b", "track_name": "Yesterday", "artists": "The Beatles", "album_name": "Help!", "track_genre": "rock"},
+    {"track_id": "c", "track_name": "Hurt", "artists": "Johnny Cash", "album_name": "American IV", "track_genre": "country"},
+]
+
+
+@pytest.fixture
+def adapter(tmp_path):
+    adapter = MusicAdapter()
+    adapter.input_file = str(tmp_path / "spotify_tracks.csv")
+    adapter.output_file = str(tmp_path / "music_embeddings.parquet")
+    return adapter
+
+
+def write_tracks(adapter, rows):
+    pd.DataFrame(rows).to_csv(adapter.input_file, index=False)
+
+
+def run(adapter):
+    """Runs the job with a fresh fake backend; returns how many embed calls it made."""
+    backend = FakeBackend(dim=8)
+    run_job(adapter, pipeline=EmbeddingPipeline(backend, batch_size=1, concurrency=1, rate=1000))
+    return backend.calls
+
+
+def stored(adapter):
+    return pd.read_parquet(adapter.output_file).set_index("track_id")
+
+
+def test_unchanged_input_makes_no_calls(adapter):
+    write_tracks(adapter, TRACKS[2:])
+    assert run(adapter) == 2
+    assert run(adapter) == 0
+
+
+def test_duplicate_ids_settle_after_one_run(adapter):
+    write_tracks(adapter, TRACKS)
+    assert run(adapter) == 3
+    assert run(adapter) == 0
+    assert run(adapter) == 0
+    assert sorted(stored(adapter).index) == ["a", "b", "c"]
+
+
+def test_edited_row_is_the_only_one_re_embedded(adapter):
+    write_tracks(adapter, TRACKS)
+    run(adapter)
+    before = stored(adapter)
+    edited = [dict(row) for row in TRACKS]
+    edited[2]["album_name"] = "Help! (Remastered)"
+    write_tracks(adapter, edited)
+    assert run(adapter) == 1
+    after = stored(adapter)
+    assert after.at["b", "content_hash"] != before.at["b", "content_hash"]
+    assert after.at["c", "content_hash"] == before.at["c", "content_hash"]
+    assert run(adapter) == 0
+
+
+def test_removed_ids_are_dropped(adapter):
+    write_tracks(adapter, TRACKS)
+    run(adapter)
+    write_tracks(adapter, TRACKS[:3])
+    assert run(adapter) == 0
+    assert sorted(stored(adapter).index) == ["a", "b"]
+
+
+def test_compact_keeps_only_live_ids_and_newest_rows(tmp_path):
+    checkpoint = PartCheckpoint(str(tmp_path / "out.parquet"), "id")
+    checkpoint.write_part([{"id": 1, "value": "old"}, {"id": 2, "value": "two"}])
+    checkpoint.write_part([{"id": 1, "value": "new"}, {"id": 3, "value": "three"}])
+    assert checkpoint.compact(keep_ids={1, 3}) == 2
+    assert pd.read_parquet(tmp_path / "out.parquet").to_dict("records") == [{"id": 1, "value": "new"}, {"id": 3, "value": "three"}]
+    assert checkpoint.part_files() == []
@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from cache import LRUCache
+from explanations import FakeChatModel, batch_prompt, explanation_key, generate_explanation, parse_answers, warm
+
+PAIRS = [("Heat (1995)", "Ronin (1998)"), ("Toy Story (1995)", "A Bug's Life (1998)"), ("Alien (1979)", "Aliens (1986)")]
+
+
+class FailingModel:
+    """Stands in for the live model where a test expects no LLM call at all."""
+
+    def generate_content(self, prompt):
+        raise AssertionError(f"unexpected LLM call: {prompt}")
+
+
+def test_fake_model_answers_round_trip_through_the_prompt():
+    model = FakeChatModel()
+    answers = parse_answers(model.generate_content(batch_prompt(PAIRS, "movie")).text, len(PAIRS))
+    assert sorted(answers) == [0, 1, 2]
+    for position, (original, recommended) in enumerate(PAIRS):
+        assert original in answers[position] and recommended in answers[position]
+
+
+def test_batch_prompt_numbers_pairs_and_names_the_item_type():
+    prompt = batch_prompt(PAIRS[:2], "music")
+    assert "music expert" in prompt and "second song" in prompt
+    assert "1. 'Heat (1995)' -> 'Ronin (1998)'" in prompt
+    assert "2. 'Toy Story (1995)' -> 'A Bug's Life (1998)'" in prompt
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('```json\n{"1": "one", "2": "two"}\n```', {0: "one", 1: "two"}),
+    ('Sure! Here you go: {"2": " two "} Hope this helps.', {1: "two"}),
+    ('{"1": "one", "3": "three", "0": "zero", "x": "ex"}', {0: "one"}),  # Out-of-range and non-numeric keys
+    ('{"1": "", "2": 5, "3": null}', {}),
+    ('{"1": "cut off mid', {}),
+    ('["one", "two"]', {}),
+    ("no json at all", {}),
+])
+def test_parse_answers_keeps_only_well_formed_answers(text, expected):
+    assert parse_answers(text, count=2) == expected
+
+
+def test_rerun_makes_no_calls_for_cached_pairs():
+    cache, model = LRUCache("explanations"), FakeChatModel()
+    assert warm("movies", PAIRS, "movie", model, cache, pairs_per_call=2, workers=2) == (3, 2)
+    assert model.calls == 2
+    assert warm("movies", PAIRS, "movie", model, cache, pairs_per_call=2, workers=2) == (0, 0)
+    assert model.calls == 2
+
+
+def test_missing_answers_are_left_for_the_next_run():
+    class PartialModel(FakeChatModel):
+        def generate_content(self, prompt):
+            answers = json.loads(super().generate_content(prompt).text.strip("`json\n"))
+            answers.pop("2", None)
+
+            class Response:
+                text = json.dumps(answers)
+            return Response()
+
+    cache = LRUCache("explanations")
+    assert warm("movies", PAIRS, "movie", PartialModel(), cache, pairs_per_call=3, workers=1) == (2, 1)
+    assert cache.get(explanation_key(*PAIRS[1], "movie")) is None
+    model = FakeChatModel()
+    assert warm("movies", PAIRS, "movie", model, cache, pairs_per_call=3, workers=1) == (1, 1)
+    assert "A Bug's Life" in cache.get(explanation_key(*PAIRS[1], "movie"))
+
+
+@pytest.mark.parametrize("item_type", ["movie", "book", "music"])
+def test_warmed_explanations_are_what_requests_read(item_type):
+    cache = LRUCache("explanations")
+    warm("catalog", PAIRS, item_type, FakeChatModel(), cache, pairs_per_call=20, workers=1)
+    for original, recommended in PAIRS:
+        explanation = generate_explanation(FailingModel(), cache, original, recommended, item_type)
+        assert original in explanation and recommended in explanation
@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+from autocomplete import Autocomplete
+from title_index import TRACK_SEPARATOR, TitleIndex, TrackIndex, process_title_for_search, track_search_keys
+
+
+@pytest.fixture
+def tracks():
+    df = pd.DataFrame({
+        "title": ["Creep", "Yesterday (Remastered 2009)", "Creep", "Yesterday - Live", "Thesmash"],
+        "artists": ["Radiohead", "The Beatles", "The Smashing Pumpkins", "The Beatles", "Ing Pumpkins"],
+        "popularity": [90, 80, 40, 30, 95],
+    })
+    df["search_title"] = df["title"].apply(process_title_for_search)
+    df["search_artist"] = df["artists"].apply(process_title_for_search)
+    index = TrackIndex(TitleIndex(df["search_title"]), df["search_artist"])
+    autocomplete = Autocomplete(track_search_keys(df["search_title"], df["search_artist"]), df["popularity"] / 100)
+    return df, index, autocomplete
+
+
+def search(df, autocomplete, query):
+    """What /search/music returns for a query."""
+    matches = df.iloc[autocomplete.complete(process_title_for_search(query))]
+    return [f"{title}{TRACK_SEPARATOR}{artists}" for title, artists in zip(matches["title"], matches["artists"])]
+
+
+@pytest.mark.parametrize("query", ["creep", "yesterday", "smashing", "beatles"])
+def test_every_search_result_resolves_to_its_own_row(tracks, query):
+    df, index, autocomplete = tracks
+    results = search(df, autocomplete, query)
+    assert results
+    for result in results:
+        row = index.find(result)
+        assert row is not None, result
+        assert f"{df.at[row, 'title']}{TRACK_SEPARATOR}{df.at[row, 'artists']}" == result
+
+
+def test_artist_picks_between_tracks_with_the_same_name(tracks):
+    _, index, _ = tracks
+    assert index.find("Creep - The Smashing Pumpkins") == 2
+    assert index.find("Creep - Radiohead") == 0
+    assert index.find("Yesterday (Remastered 2009) - The Beatles") == 1
+
+
+def test_track_names_containing_the_separator_split_on_the_last_one(tracks):
+    _, index, _ = tracks
+    assert index.find("Yesterday - Live - The Beatles") == 3
+    assert index.find("Yesterday - Live") == 3
+
+
+def test_bare_track_names_resolve_to_the_most_popular_match(tracks):
+    _, index, _ = tracks
+    assert index.find("creep") == 0
+    assert index.find("Yesterday") == 1
+    assert index.find("nothing like this") is None
+
+
+def test_autocomplete_does_not_match_across_track_and_artist(tracks):
+    df, _, autocomplete = tracks
+    # Without the separator, the more popular "thesmash" + "ingpumpkins" would contain the query verbatim and rank first
+    assert search(df, autocomplete, "smashingpumpkins")[0] == "Creep - The Smashing Pumpkins"
@@ -0,0 +1,104 @@
+from itertools import islice
+import re
+import numpy as np
+
+_EMPTY = np.empty(0, dtype=np.int32)
+
+
+def process_title_for_search(title: str):
+    """Applies all normalization rules to a title string for searching."""
+    if not isinstance(title, str): return ""
+    
+    # Step 1: Remove ANY text in parentheses at the end of the string.
+    # This now handles both (1995) and (Series, #Number) formats like in Harry Potter.
+    processed_title = re.sub(r'\s*\([^)]*\)\s*$', '', title).strip()
+    
+    # Step 2: Now, handle articles like ", The".
+    if processed_title.endswith(', The'): processed_title = 'The ' + processed_title[:-5]
+    if processed_title.endswith(', A'): processed_title = 'A ' + processed_title[:-3]
+    if processed_title.endswith(', An'): processed_title = 'An ' + processed_title[:-4]
+    
+    # Step 3: Remove leading articles.
+    processed_title = re.sub(r'^(the|a|an)\s+', '', processed_title, flags=re.IGNORECASE)
+    
+    # Step 4: Final cleanup.
+    return re.sub(r'[^a-zA-Z0-9]', '', processed_title).lower()
+
+
+def _trigrams(text: str):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TitleIndex:
+    """Lookup structures over a catalog's normalized `search_title` column, built once at load time.
+
+    Row numbers are positions in the catalog frame (which the loaders keep equal to df.index).
+    Exact matches go through a hash map; substring matches intersect trigram posting lists and
+    only verify the surviving candidates, instead of running str.contains over every title.
+    """
+
+    def __init__(self, search_titles):
+        self.titles = list(search_titles)
+        self.exact = {}
+        grams = {}
+        for row, title in enumerate(self.titles):
+            self.exact.setdefault(title, row)  # First row wins, like df[...].iloc[0]
+            for gram in _trigrams(title):
+                grams.setdefault(gram, []).append(row)
+        self.postings = {gram: np.array(rows, dtype=np.int32) for gram, rows in grams.items()}
+
+    def find(self, search_term: str):
+        """Row of the first title equal to `search_term`, or None."""
+        return self.exact.get(search_term)
+
+    def find_containing(self, search_term: str, limit: int = None):
+        """Rows (in catalog order) whose title contains `search_term`, up to `limit` of them."""
+        if len(search_term) < 3:
+            # Too short for trigrams; these are rare enough that a scan is fine
+            rows = (row for row, title in enumerate(self.titles) if search_term in title)
+        else:
+            posting_lists = sorted((self.postings.get(gram, _EMPTY) for gram in _trigrams(search_term)), key=len)
+            candidates = posting_lists[0]
+            for postings in posting_lists[1:]:
+                if not len(candidates): break
+                candidates = np.intersect1d(candidates, postings, assume_unique=True)
+            # Sharing every trigram doesn't guarantee a contiguous match, so verify
+            rows = (int(row) for row in candidates if search_term in self.titles[row])
+        return list(islice(rows, limit))
+
+    def find_first_containing(self, search_term: str):
+        """Row of the first title containing `search_term`, or None."""
+        rows = self.find_containing(search_term, limit=1)
+        return rows[0] if rows else None
+
+
+TRACK_SEPARATOR = " - "  # Between track name and artists in "track - artist" strings, as returned by /search/music
+
+
+def track_search_keys(search_titles, search_artists):
+    """Normalized "track|artist" keys; the "|" keeps substring and trigram matches from spanning both halves."""
+    return [f"{title}|{artist}" for title, artist in zip(search_titles, search_artists)]
+
+
+class TrackIndex:
+    """Resolves track names, and "track - artist" strings, to catalog rows.
+
+    A "track - artist" query is split on its last separator (track names often contain " - "
+    themselves, artist names rarely do) and each half is normalized like the catalog's
+    search_title and search_artist columns, so every string /search/music returns resolves.
+    """
+
+    def __init__(self, titles: TitleIndex, search_artists):
+        self.titles = titles
+        self.tracks = TitleIndex(track_search_keys(titles.titles, search_artists))
+
+    def find(self, query: str):
+        """Tries track + artist, then the exact track name, then the first track name containing the query."""
+        title, separator, artists = query.rpartition(TRACK_SEPARATOR) if isinstance(query, str) else ("", "", "")
+        if separator:
+            row = self.tracks.find(f"{process_title_for_search(title)}|{process_title_for_search(artists)}")
+            if row is not None: return row
+        search_term = process_title_for_search(query)
+        if not search_term: return None
+        row = self.titles.find(search_term)
+        return row if row is not None else self.titles.find_first_containing(search_term)
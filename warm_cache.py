@@ -0,0 +1,43 @@
+"""Pre-populates the on-disk poster and cover cache by walking the whole catalog.
+
+Run offline (e.g. before a deploy) from the repo root:
+    python warm_cache.py                # posters and covers
+    python warm_cache.py --only posters --workers 8
+Items already in the on-disk cache (including recent "not found" results) are skipped.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from tqdm import tqdm
+
+import api
+
+
+def warm(name: str, cache, keys, fetch, workers: int):
+    missing = [key for key in keys if cache.store.get(cache.name, key) is None]
+    print(f"{name}: {len(keys) - len(missing)} already cached, fetching {len(missing)}...")
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in tqdm(pool.map(fetch, missing), total=len(missing), desc=f"Fetching {name}"):
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", choices=["posters", "covers"], default=None)
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent upstream requests")
+    args = parser.parse_args()
+
+    if api.caches.store is None:
+        raise SystemExit("CACHE_DB_PATH is empty; there is no on-disk cache to warm.")
+    if args.only in (None, "posters"):
+        tmdb_ids = [int(tmdb_id) for tmdb_id in api.movie_df['tmdbId'].unique()]
+        warm("posters", api.poster_cache, tmdb_ids, api.fetch_poster, args.workers)
+    if args.only in (None, "covers"):
+        isbns = [str(isbn) for isbn in api.book_df['isbn'].unique()]
+        warm("covers", api.cover_cache, isbns, api.fetch_book_cover, args.workers)
+    api.caches.store.flush()
+    print("On-disk cache warmed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Pre-generates explanations for the most popular seeds and their top recommendations.
+
+Walks the highest-popularity movies, books and (if loaded) tracks, takes each one's top
+neighbours (the pairs single-seed endpoints explain), and asks the LLM about many pairs per
+call with one structured prompt (see explanations.py). Answers go into the explanation cache under
+the same keys get_explanation uses, so those requests never wait on the LLM.
+
+Run offline from the repo root:
+    python warm_explanations.py                           # 1000 seeds per catalog, top neighbour each
+    python warm_explanations.py --only movies --seeds 5000 --neighbors 3 --pairs-per-call 25
+    python warm_explanations.py --model fake              # local fake model, no API calls
+Pairs already cached are skipped; pairs an answer was missing for are left for the next run.
+"""
+import argparse
+
+import api
+from explanations import FakeChatModel, explanation_label, warm
+
+CATALOG_TYPES = {"movies": "movie", "books": "book", "music": "music"}
+
+
+def seed_pairs(df, item_type: str, seeds: int, neighbors: int):
+    """(original, recommended) labels for the top `seeds` rows by popularity and their best neighbours."""
+    pairs = []
+    for row_index in df['popularity'].nlargest(seeds).index:
+        original = explanation_label(df.loc[row_index], item_type)
+        for _, recommended in api.get_similar_items(row_index, df, neighbors).iterrows():
+            pairs.append((original, explanation_label(recommended, item_type)))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", choices=sorted(CATALOG_TYPES), default=None)
+    parser.add_argument("--seeds", type=int, default=1000, help="Most popular items per catalog")
+    parser.add_argument("--neighbors", type=int, default=1, help="Top recommendations explained per seed")
+    parser.add_argument("--pairs-per-call", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent LLM calls")
+    parser.add_argument("--model", choices=["gemini", "fake"], default="gemini")
+    args = parser.parse_args()
+
+    if api.caches.store is None:
+        raise SystemExit("CACHE_DB_PATH is empty; there is no on-disk cache to warm.")
+    model = FakeChatModel() if args.model == "fake" else api.chat_model
+    catalogs = {"movies": api.movie_df, "books": api.book_df, "music": api.music_df}
+    for name in ([args.only] if args.only else CATALOG_TYPES):
+        if catalogs[name] is None:
+            print(f"Skipping {name}: catalog not loaded.")
+            continue
+        pairs = seed_pairs(catalogs[name], CATALOG_TYPES[name], args.seeds, args.neighbors)
+        explained, calls = warm(name, pairs, CATALOG_TYPES[name], model, api.explanation_cache, args.pairs_per_call, args.workers)
+        print(f"{name}: {explained} explanations from {calls} LLM calls.")
+    api.caches.store.flush()
+    print("Explanation cache warmed.")
+
+
+if __name__ == "__main__":
+    main()